@@ -1,325 +1,359 @@
-import json
-import os
+import atexit
 import random
-from collections import defaultdict
+from experience import ExperienceStore, ExperienceTable
+from patterns import FLAG, MINE, OFFSETS, UNKNOWN, WALL, canonical_pattern, from_canonical, to_canonical
+from profiling import profiler
+from solver import build_constraints, mine_probabilities, solve_constraints
+
+# Если за ход изменилось больше 1/REBUILD_RATIO клеток поля, границу дешевле построить заново
+REBUILD_RATIO = 32
 
 class AIHelper:
     """
     Класс ИИ для игры Сапер.
     Использует комбинацию опыта, логики и вероятностного анализа для принятия решений.
     """
-    def __init__(self):
-        self.field = None  # Текущее состояние игрового поля
+    def __init__(self, seed=None, experience_path='ai_experience.log', learn=True, legacy_path=True):
+        self.field = None  # Текущее игровое поле (Board)
         self.rows = 0      # Количество строк в поле
         self.cols = 0      # Количество столбцов в поле
-        # Словарь для хранения опыта: ключ - паттерн поля, значение - список успешных ходов с их статистикой
-        self.experience = defaultdict(lambda: defaultdict(int))  # pattern -> {(x,y) -> success_count}
-        # Счетчики для статистики
-        self.success_count = 0  # Количество успешных ходов
-        self.failure_count = 0  # Количество неуспешных ходов
-        # Загружаем сохраненный опыт при создании
+        # Индекс границы: открытые числа с неизвестными соседями и неизвестные клетки рядом с ними.
+        # Обновляется по изменившимся клеткам, поэтому ходу не нужен полный обход поля
+        self.frontier_numbers = set()   # индексы x * cols + y
+        self.frontier_unknowns = set()  # индексы x * cols + y
+        self.neighbors = []             # общая таблица соседей поля: индекс -> кортеж индексов
+        # Оценка больших компонент границы выборкой решений:
+        # число выборок (0 - отключить), лимит времени и генератор случайных чисел
+        self.samples = 2000
+        self.sample_time = 0.05
+        self.rng = random.Random(seed)
+        # Результаты решателей для текущего состояния поля
+        self.certain_moves = None
+        self.probabilities = None
+        # Журнал опыта на диске: ходы дописываются пачками, а не перезаписью всего файла.
+        # experience_path=None - ИИ играет без опыта; legacy_path - опыт старого формата (см. ExperienceStore)
+        self.store = ExperienceStore(experience_path, legacy_path) if experience_path else None
+        # learn=False - опыт только читается, результаты ходов не запоминаются
+        self.learn = learn
+        atexit.register(self.save_experience)
+        # Таблица опыта: ключ - канонический паттерн поля, значение - успешные ходы с их статистикой
+        # (pattern key -> {(dx,dy) -> success_count}); вместе с ней ведутся счетчики успешных и неуспешных ходов
+        self.experience = None
         self.load_experience()
 
     def save_experience(self):
         """
         Сохраняет опыт в файл.
-        Опыт включает в себя паттерны поля и успешные ходы с их статистикой.
+        Новые ходы уже лежат в журнале хранилища, достаточно дописать их на диск.
         """
-        data = {
-            'experience': {},
-            'success_count': self.success_count,
-            'failure_count': self.failure_count
-        }
-        
-        # Преобразуем паттерны и ходы в формат, который можно сохранить в JSON
-        for pattern, moves in self.experience.items():
-            if not moves:  # Пропускаем пустые паттерны
-                continue
-                
-            pattern_str = str(pattern)  # Преобразуем кортеж в строку
-            data['experience'][pattern_str] = {}
-            
-            for (dx, dy), count in moves.items():
-                if count > 0:  # Сохраняем только ненулевые счетчики
-                    move_str = f"({dx},{dy})"  # Сохраняем смещения в формате (dx,dy)
-                    data['experience'][pattern_str][move_str] = count
-
+        if self.store is None:
+            return
         try:
-            file_path = 'ai_experience.json'
-            
-            # Сначала читаем существующий файл, если он есть
-            existing_data = {'experience': {}, 'success_count': 0, 'failure_count': 0}
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-            except:
-                pass
-            
-            # Объединяем существующие данные с новыми
-            for pattern, moves in data['experience'].items():
-                if pattern not in existing_data['experience']:
-                    existing_data['experience'][pattern] = {}
-                for move, count in moves.items():
-                    existing_data['experience'][pattern][move] = count
-            
-            # Сохраняем объединенные данные
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(existing_data, f, indent=4, ensure_ascii=False)
-        except Exception as e:
+            self.store.flush()
+            if self.experience is not None:
+                # Выросший хвост таблицы уходит в индекс, чтобы память не росла с опытом
+                self.experience.flushed()
+        except OSError as e:
             print(f"Ошибка при сохранении опыта: {e}")
 
     def load_experience(self):
         """
-        Загружает опыт из файла.
-        Восстанавливает сохраненные паттерны и статистику ходов.
+        Подключает опыт из файла.
+        Таблица читает индекс и журнал при первом обращении, а паттерны - по одному по мере поиска,
+        поэтому создание ИИ не зависит от объема накопленного опыта.
         """
-        try:
-            if os.path.exists('ai_experience.json'):
-                with open('ai_experience.json', 'r') as f:
-                    data = json.load(f)
-                    self.experience = defaultdict(lambda: defaultdict(int))
-                    for pattern_str, moves in data['experience'].items():
-                        # Преобразуем строку обратно в кортеж
-                        pattern = eval(pattern_str)
-                        for move_str, count in moves.items():
-                            # Преобразуем строку (dx,dy) обратно в кортеж
-                            dx, dy = map(int, move_str.strip('()').split(','))
-                            self.experience[pattern][(dx, dy)] = count
-                    self.success_count = data['success_count']
-                    self.failure_count = data['failure_count']
-        except Exception as e:
-            print(f"Ошибка при загрузке опыта: {e}")
+        if self.store is not None:
+            self.experience = ExperienceTable(self.store)
 
-    def set_field(self, field, rows, cols):
+    def set_field(self, field, rows, cols, changed=None):
         """
         Устанавливает текущее состояние поля.
-        Вызывается перед каждым ходом ИИ.
+        field - игровое поле Board, ИИ читает его состояние напрямую.
+        changed - индексы клеток, изменившихся с прошлого вызова той же партии
+        (field может быть и новой копией прошлого поля, например в потоке ИИ).
+        Если changed не передан, сменился размер поля или изменений так много, что обновление
+        дороже полного построения, граница строится заново, иначе обновляется только вокруг
+        изменившихся клеток.
+        """
+        self.certain_moves = None
+        self.probabilities = None
+        with profiler.stage('ai.frontier'):
+            if changed is None or self.field is None or (rows, cols) != (self.rows, self.cols) \
+                    or len(changed) * REBUILD_RATIO > field.size:
+                self.field = field
+                self.rows = rows
+                self.cols = cols
+                self.rebuild_frontier()
+            else:
+                self.field = field
+                self.update_frontier(changed)
+
+    def is_unknown(self, i):
+        """Клетка не открыта и не помечена флажком"""
+        return not self.field.revealed[i] and not self.field.flagged[i]
+
+    def is_frontier_number(self, i):
+        """Открытое число, рядом с которым остались неизвестные клетки"""
+        field = self.field
+        if not field.revealed[i] or field.mine[i] or not field.adjacent[i]:
+            return False
+        return any(self.is_unknown(n) for n in self.neighbors[i])
+
+    def rebuild_frontier(self):
+        """Полностью перестраивает индекс границы (новое поле)"""
+        field = self.field
+        self.neighbors = field.table.neighbors
+        # Неизвестные соседи считаются сверткой сразу для всего поля
+        unknown_around = field.count_unknown_neighbors()
+        self.frontier_numbers = {i for i in range(field.size)
+                                 if unknown_around[i] and field.revealed[i] and field.adjacent[i]
+                                 and not field.mine[i]}
+        self.frontier_unknowns = set()
+        for i in self.frontier_numbers:
+            self.frontier_unknowns.update(n for n in self.neighbors[i] if self.is_unknown(n))
+
+    def update_frontier(self, changed):
+        """
+        Обновляет индекс границы после хода.
+        Статус числа зависит только от его соседей, а статус неизвестной клетки -
+        от соседних чисел, поэтому достаточно пересмотреть два кольца вокруг изменений.
         """
-        self.field = field
-        self.rows = rows
-        self.cols = cols
+        neighbors = self.neighbors
+        affected = set(changed)
+        for i in changed:
+            affected.update(neighbors[i])
+        for i in affected:
+            if self.is_frontier_number(i):
+                self.frontier_numbers.add(i)
+            else:
+                self.frontier_numbers.discard(i)
+
+        ring = set(affected)
+        for i in affected:
+            ring.update(neighbors[i])
+        for i in ring:
+            if self.is_unknown(i) and any(n in self.frontier_numbers for n in neighbors[i]):
+                self.frontier_unknowns.add(i)
+            else:
+                self.frontier_unknowns.discard(i)
 
     def get_neighbors(self, x, y):
         """
         Получает список соседних клеток для заданной позиции.
         Включает все 8 соседних клеток (по диагонали и по сторонам).
         """
-        neighbors = []
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.rows and 0 <= ny < self.cols and (dx != 0 or dy != 0):
-                    neighbors.append((nx, ny))
-        return neighbors
+        return [divmod(n, self.cols) for n in self.neighbors[x * self.cols + y]]
 
     def get_unrevealed_neighbors(self, x, y):
         """
         Получает список неоткрытых соседних клеток.
         Исключает клетки с флажками.
         """
-        return [(nx, ny) for nx, ny in self.get_neighbors(x, y) 
-                if not self.field[nx][ny].is_revealed and not self.field[nx][ny].is_flagged]
+        return [divmod(n, self.cols) for n in self.neighbors[x * self.cols + y] if self.is_unknown(n)]
 
     def get_flagged_neighbors(self, x, y):
         """
         Получает список соседних клеток с флажками.
         Используется для подсчета известных мин вокруг клетки.
         """
-        return [(nx, ny) for nx, ny in self.get_neighbors(x, y) 
-                if self.field[nx][ny].is_flagged]
+        return [divmod(n, self.cols) for n in self.neighbors[x * self.cols + y] if self.field.flagged[n]]
 
     def get_field_pattern(self, x, y):
         """
         Получает паттерн поля вокруг клетки (x, y).
-        Паттерн - это последовательность состояний соседних клеток:
-        - 'M' для мин
-        - числа для открытых клеток
-        - 'F' для флажков
-        - 'U' для неоткрытых клеток
-        """
-        pattern = []
-        # Получаем соседей в фиксированном порядке
-        neighbors = []
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx != 0 or dy != 0:  # Пропускаем саму клетку
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < self.rows and 0 <= ny < self.cols:
-                        neighbors.append((nx, ny, dx, dy))  # Сохраняем и координаты, и смещения
+        Паттерн - это состояния 8 соседних клеток в фиксированном порядке, по 4 бита на клетку:
+        - числа 0-8 для открытых клеток
+        - MINE для мин, FLAG для флажков, UNKNOWN для неоткрытых клеток
+        - WALL для соседей за краем поля
+        Паттерн приводится к каноническому виду по 8 поворотам и отражениям,
+        поэтому одинаковые ситуации в разной ориентации дают один ключ.
+        Возвращает (канонический ключ, номер симметрии, которая к нему приводит).
+        """
+        field = self.field
+        cells = self.neighbors[x * self.cols + y]
+        if len(cells) == 8:
+            # У клетки не на краю соседи в таблице идут как раз в порядке OFFSETS
+            codes = [(MINE if field.mine[n] else field.adjacent[n]) if field.revealed[n] else
+                     FLAG if field.flagged[n] else UNKNOWN
+                     for n in cells]
+            return canonical_pattern(codes)
 
-        # Сортируем соседей для получения фиксированного порядка
-        neighbors.sort(key=lambda n: (n[0], n[1]))
-        
-        for nx, ny, dx, dy in neighbors:
-            cell = self.field[nx][ny]
-            if cell.is_revealed:
-                if cell.is_mine:
-                    pattern.append('M')
-                else:
-                    pattern.append(str(cell.adjacent_mines))
-            elif cell.is_flagged:
-                pattern.append('F')
+        codes = []
+        for dx, dy in OFFSETS:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < self.rows and 0 <= ny < self.cols):
+                codes.append(WALL)
+                continue
+            n = nx * self.cols + ny
+            if field.revealed[n]:
+                codes.append(MINE if field.mine[n] else field.adjacent[n])
+            elif field.flagged[n]:
+                codes.append(FLAG)
             else:
-                pattern.append('U')
-        
-        return tuple(pattern), neighbors
+                codes.append(UNKNOWN)
+        return canonical_pattern(codes)
 
     def learn_from_move(self, x, y, was_successful):
         """
         Запоминает результат хода.
         Если ход был успешным, увеличивает счетчик успешных ходов для данного паттерна.
         В любом случае обновляет общую статистику.
+        Ничего не делает, если ИИ создан без опыта или с learn=False.
         """
-        pattern, neighbors = self.get_field_pattern(x, y)
-        
+        if not self.learn or self.experience is None:
+            return
         if was_successful:
-            # Вычисляем смещение относительно центральной клетки
-            # Центральная клетка - это та, для которой мы получили паттерн
-            dx = 0  # Смещение по x
-            dy = 0  # Смещение по y
-            
-            # Ищем клетку, которая является целью хода
-            for nx, ny, ndx, ndy in neighbors:
-                if nx == x and ny == y:
-                    dx = ndx
-                    dy = ndy
-                    break
-            
+            # Паттерн строится вокруг самой клетки хода, поэтому смещение хода нулевое;
+            # в опыт оно пишется в координатах канонического паттерна
+            key, symmetry = self.get_field_pattern(x, y)
+            dx, dy = to_canonical(symmetry, 0, 0)
+
             # Сохраняем опыт
-            self.experience[pattern][(dx, dy)] += 1
-            self.success_count += 1
-            self.save_experience()
-        else:
-            self.failure_count += 1
+            self.experience.add(key, dx, dy)
+            self.store.add_move(key, dx, dy)
+        self.experience.add_result(was_successful)
+        self.store.add_result(was_successful)
+        # На диск журнал уходит пачками
+        if self.store.flush_due():
             self.save_experience()
 
+    def get_certain_moves(self):
+        """
+        Находит все клетки, которые можно определить логически.
+        Строит ограничения по числам на границе и сводит их до неподвижной точки.
+        Возвращает пару отсортированных списков (безопасные клетки, мины) в координатах (x, y).
+        Результат кэшируется до следующего изменения поля.
+        """
+        if self.certain_moves is None:
+            with profiler.stage('ai.rules'):
+                constraints = build_constraints(self.field, self.frontier_numbers)
+                safe, mines = solve_constraints(constraints)
+                self.certain_moves = (
+                    [divmod(i, self.cols) for i in sorted(safe)],
+                    [divmod(i, self.cols) for i in sorted(mines)],
+                )
+        return self.certain_moves
+
+    def get_probabilities(self):
+        """
+        Вычисляет вероятности мин для клеток границы с учетом общего числа оставшихся мин.
+        Возвращает (словарь индекс -> вероятность, вероятность для внутренних клеток или None,
+        признак точного расчета, доверительные интервалы для клеток, оцененных выборкой).
+        Результат кэшируется до следующего изменения поля.
+        """
+        if self.probabilities is None:
+            with profiler.stage('ai.probability'):
+                field = self.field
+                constraints = build_constraints(field, self.frontier_numbers)
+                unknown_count = field.size - field.revealed_safe - field.flagged_cells
+                mines_left = field.mines - field.flagged_cells
+                self.probabilities = mine_probabilities(constraints, unknown_count, mines_left,
+                                                        samples=self.samples, sample_time=self.sample_time,
+                                                        rng=self.rng)
+        return self.probabilities
+
     def get_safe_move(self):
         """
         Находит ход, используя следующую стратегию:
-        1. Проверяет опыт - если находит похожую ситуацию, делает ход с наибольшим количеством успехов
-        2. Ищет безопасные ходы на основе чисел
-        3. Ищет клетки с минимальным риском
+        1. Ищет логически безопасные клетки решателем ограничений
+        2. Ищет клетки с минимальным риском
+        3. Если таких клеток несколько, выбирает по опыту ту, ход в которую чаще был успешным
+           (опыт не перекрывает вероятности, а только разрешает равенство)
         4. Если ничего не находит, выбирает случайную неоткрытую клетку
+        Шаги 1-3 смотрят только на клетки границы.
         """
-        # Шаг 1: Проверяем опыт
-        for x in range(self.rows):
-            for y in range(self.cols):
-                if not self.field[x][y].is_revealed and not self.field[x][y].is_flagged:
-                    pattern, neighbors = self.get_field_pattern(x, y)
-                    if pattern in self.experience:
-                        # Находим ход с наибольшим количеством успехов
-                        moves = self.experience[pattern]
-                        if moves:
-                            # Фильтруем только неоткрытые клетки
-                            valid_moves = {}
-                            for (dx, dy), count in moves.items():
-                                nx, ny = x + dx, y + dy
-                                if (0 <= nx < self.rows and 0 <= ny < self.cols and 
-                                    not self.field[nx][ny].is_revealed and 
-                                    not self.field[nx][ny].is_flagged):
-                                    valid_moves[(nx, ny)] = count
-                            
-                            if valid_moves:
-                                best_move = max(valid_moves.items(), key=lambda x: x[1])[0]
-                                return best_move
-
-        # Шаг 2: Ищем клетки с числами
-        number_cells = []
-        for x in range(self.rows):
-            for y in range(self.cols):
-                cell = self.field[x][y]
-                if cell.is_revealed and not cell.is_mine and cell.adjacent_mines > 0:
-                    number_cells.append((x, y, cell.adjacent_mines))
-
-        # Если нет клеток с числами, ищем любую неоткрытую клетку
-        if not number_cells:
-            unrevealed_cells = []
-            for x in range(self.rows):
-                for y in range(self.cols):
-                    if not self.field[x][y].is_revealed and not self.field[x][y].is_flagged:
-                        unrevealed_cells.append((x, y))
-            if unrevealed_cells:
-                # Выбираем случайную неоткрытую клетку
-                return random.choice(unrevealed_cells)
+        with profiler.stage('ai.safe_move'):
+            move, stage = self.choose_safe_move()
+        profiler.count('decision.' + stage)
+        return move
 
-        # Шаг 3: Анализируем каждую клетку с числом
-        for x, y, number in number_cells:
-            unrevealed = self.get_unrevealed_neighbors(x, y)
-            flagged = self.get_flagged_neighbors(x, y)
-            
-            # Если число равно количеству флажков, остальные клетки безопасны
-            if number == len(flagged) and unrevealed:
-                return unrevealed[0]
+    def choose_safe_move(self):
+        """Выбор хода для get_safe_move; возвращает (ход, этап стратегии, который его выбрал)"""
+        # Шаг 1: Ищем безопасные клетки логикой
+        safe, mines = self.get_certain_moves()
+        if safe:
+            return safe[0], 'rules'
 
-        # Шаг 4: Ищем клетку с минимальным риском
-        min_risk = float('inf')
-        best_moves = []
+        # Известные мины не рассматриваем как кандидатов на ход
+        known_mines = {self.field.index(x, y) for x, y in mines}
+        frontier_unknowns = [i for i in sorted(self.frontier_unknowns) if i not in known_mines]
+        frontier_numbers = sorted(self.frontier_numbers)
 
-        for x in range(self.rows):
-            for y in range(self.cols):
-                cell = self.field[x][y]
-                if cell.is_revealed or cell.is_flagged:
-                    continue
+        # Если на границе нет чисел, ищем любую неоткрытую клетку
+        if not frontier_numbers:
+            return self.get_random_move(), 'fallback'
 
-                # Считаем риск для клетки
-                risk = 0
-                count = 0
-                for nx, ny in self.get_neighbors(x, y):
-                    neighbor = self.field[nx][ny]
-                    if neighbor.is_revealed and not neighbor.is_mine:
-                        unrevealed = self.get_unrevealed_neighbors(nx, ny)
-                        flagged = self.get_flagged_neighbors(nx, ny)
-                        if unrevealed:
-                            remaining_mines = neighbor.adjacent_mines - len(flagged)
-                            if remaining_mines > 0:
-                                # Риск = оставшиеся мины / количество неоткрытых клеток
-                                risk += remaining_mines / len(unrevealed)
-                                count += 1
+        # Шаг 2: Ищем клетку с минимальной вероятностью мины
+        probabilities, interior_probability, exact, bounds = self.get_probabilities()
+        candidates = {i: p for i, p in probabilities.items() if i not in known_mines}
+        if candidates:
+            min_risk = min(candidates.values())
+            if interior_probability is None or min_risk <= interior_probability:
+                best_moves = [divmod(i, self.cols) for i in sorted(candidates)
+                              if candidates[i] - min_risk < 1e-9]
+                # Шаг 3: Из равных по риску клеток опыт выбирает те, где ходы чаще всего были успешными
+                if self.experience is not None and len(best_moves) > 1:
+                    scores = self.experience_scores(frontier_unknowns, best_moves)
+                    if scores:
+                        best_score = max(scores.values())
+                        best_moves = [move for move in best_moves if scores.get(move) == best_score]
+                        return self.rng.choice(best_moves), 'experience'
+                # Выбираем случайную клетку из списка клеток с минимальным риском
+                return self.rng.choice(best_moves), 'probability'
 
-                if count > 0:
-                    risk = risk / count  # Усредняем риск по всем соседним числам
-                    if risk < min_risk:
-                        min_risk = risk
-                        best_moves = [(x, y)]
-                    elif risk == min_risk:
-                        best_moves.append((x, y))
+        # Шаг 4: Внутренние клетки безопаснее границы или граница пуста - ищем любую неоткрытую клетку
+        return self.get_random_move(exclude=self.frontier_unknowns if probabilities else ()), 'fallback'
 
-        if best_moves:
-            # Выбираем случайную клетку из списка клеток с минимальным риском
-            return random.choice(best_moves)
+    def experience_scores(self, frontier_unknowns, moves):
+        """
+        Опыт для клеток moves: для каждой клетки - наибольшее число успехов хода в нее
+        по паттернам клеток границы frontier_unknowns. Клетки без опыта в словарь не попадают.
+        """
+        targets = set(moves)
+        scores = {}
+        with profiler.stage('ai.experience'):
+            for i in frontier_unknowns:
+                x, y = divmod(i, self.cols)
+                key, symmetry = self.get_field_pattern(x, y)
+                found = self.experience.get(key)
+                if not found:
+                    continue
+                for (cdx, cdy), count in found.items():
+                    dx, dy = from_canonical(symmetry, cdx, cdy)
+                    move = (x + dx, y + dy)
+                    if move in targets and count > scores.get(move, 0):
+                        scores[move] = count
+        return scores
 
-        # Шаг 5: Если не нашли клетку с минимальным риском, ищем любую неоткрытую клетку
-        unrevealed_cells = []
-        for x in range(self.rows):
-            for y in range(self.cols):
-                if not self.field[x][y].is_revealed and not self.field[x][y].is_flagged:
-                    unrevealed_cells.append((x, y))
+    def get_random_move(self, exclude=()):
+        """
+        Выбирает случайную неоткрытую клетку без флажка.
+        exclude - индексы клеток, которые не нужно рассматривать.
+        """
+        with profiler.stage('ai.fallback'):
+            unrevealed_cells = []
+            for x in range(self.rows):
+                for y in range(self.cols):
+                    if not self.field.is_revealed(x, y) and not self.field.is_flagged(x, y) and \
+                       self.field.index(x, y) not in exclude:
+                        unrevealed_cells.append((x, y))
         
         if unrevealed_cells:
             # Выбираем случайную неоткрытую клетку
-            return random.choice(unrevealed_cells)
+            return self.rng.choice(unrevealed_cells)
 
         return (0, 0)
 
     def get_mine_move(self):
         """
         Находит клетку, где точно есть мина.
-        Использует логику: если число минус количество флажков равно количеству неоткрытых клеток,
-        то все неоткрытые клетки содержат мины.
+        Использует решатель ограничений: помимо правила "число минус флажки равно
+        количеству неоткрытых клеток" учитывает пересечения соседних чисел.
         """
-        for x in range(self.rows):
-            for y in range(self.cols):
-                cell = self.field[x][y]
-                if not cell.is_revealed or cell.is_mine:
-                    continue
-
-                unrevealed = self.get_unrevealed_neighbors(x, y)
-                flagged = self.get_flagged_neighbors(x, y)
-
-                # Если число минус флажки равно количеству неоткрытых, все неоткрытые - мины
-                if cell.adjacent_mines - len(flagged) == len(unrevealed) and unrevealed:
-                    return unrevealed[0]
-
+        safe, mines = self.get_certain_moves()
+        if mines:
+            profiler.count('decision.rules_mine')
+            return mines[0]
         return None
 
     def get_stats(self):
@@ -328,9 +362,17 @@ class AIHelper:
         - Количество успешных ходов
         - Количество неуспешных ходов
         - Процент успешных ходов
+        - Счетчики кэша опыта
         """
-        total = self.success_count + self.failure_count
+        if self.experience is None:
+            return "Опыт не используется"
+        success_count, failure_count = self.experience.counts()
+        cache = self.experience.cache_stats()
+        cache_line = (f"Кэш опыта: попаданий {cache['hits']}, промахов {cache['misses']}, "
+                      f"вытеснено {cache['evictions']}, паттернов {cache['size']} из {cache['capacity']}")
+        total = success_count + failure_count
         if total == 0:
-            return "Нет данных"
-        success_rate = (self.success_count / total) * 100
-        return f"Успешных ходов: {self.success_count}, Неуспешных: {self.failure_count}, Успешность: {success_rate:.1f}%" 
\ No newline at end of file
+            return f"Нет данных\n{cache_line}"
+        success_rate = (success_count / total) * 100
+        return (f"Успешных ходов: {success_count}, Неуспешных: {failure_count}, Успешность: {success_rate:.1f}%\n"
+                f"{cache_line}")
@@ -0,0 +1,301 @@
+import argparse
+import sys
+import time
+import numpy as np
+from board import DIFFICULTIES, parse_size
+from patterns import FLAG, UNKNOWN
+
+# Каналы тензора наблюдений planes(): 0-8 - открытое число, затем неизвестные клетки и флажки
+UNKNOWN_PLANE = 9
+FLAG_PLANE = 10
+PLANES = 11
+
+
+def count_neighbors(mine):
+    """
+    Число мин вокруг каждой клетки для стопки полей (B, строки, столбцы).
+    Окно 3x3 раскладывается на сумму по строкам и затем по столбцам.
+    """
+    line = mine.astype(np.uint8)
+    line[:, :, 1:] += mine[:, :, :-1]
+    line[:, :, :-1] += mine[:, :, 1:]
+    count = line.copy()
+    count[:, 1:] += line[:, :-1]
+    count[:, :-1] += line[:, 1:]
+    count -= mine
+    return count
+
+
+def dilate(mask):
+    """Маска, расширенная на одну клетку во все стороны (вместе с самой маской)"""
+    line = mask.copy()
+    line[:, :, 1:] |= mask[:, :, :-1]
+    line[:, :, :-1] |= mask[:, :, 1:]
+    grown = line.copy()
+    grown[:, 1:] |= line[:, :-1]
+    grown[:, :-1] |= line[:, 1:]
+    return grown
+
+
+def pack_rows(mask):
+    """Упаковывает строки стопки полей шириной до 64 клеток в числа uint64 (бит y - клетка y)"""
+    boards, rows, cols = mask.shape
+    padded = np.zeros((boards, rows, 64), dtype=bool)
+    padded[:, :, :cols] = mask
+    return np.packbits(padded.reshape(-1, 64), axis=1, bitorder='little').view(np.uint64).reshape(boards, rows)
+
+
+def unpack_rows(packed, cols):
+    bits = packed[:, :, None].view(np.uint8)
+    return np.unpackbits(bits, axis=2, count=cols, bitorder='little').astype(bool)
+
+
+def dilate_rows(packed):
+    """dilate для упакованных строк; лишние биты за краем поля убирает маска закрытых клеток"""
+    line = packed | (packed << np.uint64(1)) | (packed >> np.uint64(1))
+    grown = line.copy()
+    grown[:, 1:] |= line[:, :-1]
+    grown[:, :-1] |= line[:, 1:]
+    return grown
+
+
+def spread(revealed, closed, zero, grow):
+    """
+    Заливка для стопки полей: открытые пустые клетки расширяются функцией grow на клетку за шаг
+    внутрь закрытых клеток без флажков, пока область растет. Поля, на которых область
+    перестала расти, дальше не обрабатываются. Возвращает новую маску открытых клеток.
+    """
+    front = revealed & zero
+    # Поля, на которых область еще растет, и их части массивов
+    active = np.arange(len(revealed))
+    part_revealed, part_closed, part_zero = revealed, closed, zero
+    while True:
+        # Соседи пустой клетки не могут быть минами
+        grown = grow(front) & ~part_revealed & part_closed
+        part_revealed |= grown
+        keep = grown.reshape(len(grown), -1).any(axis=1)
+        if not keep.any():
+            break
+        front = grown & part_zero
+        if keep.sum() * 2 < len(keep):
+            # Остановившихся полей больше половины - отбрасываем их
+            revealed[active] = part_revealed
+            active = active[keep]
+            part_revealed, part_closed, part_zero = part_revealed[keep], part_closed[keep], part_zero[keep]
+            front = front[keep]
+    revealed[active] = part_revealed
+    return revealed
+
+
+class BatchEnv:
+    """
+    Пакетная среда для обучения и проверки агентов: B полей одного размера
+    хранятся массивами NumPy (поле - строка длины rows * cols, индекс клетки x * cols + y, как в Board),
+    и step() делает по одному ходу на каждом поле за один векторизованный вызов.
+    Действие - число: индекс клетки - открыть ее, индекс + rows * cols - поставить или снять флажок.
+    Первый ход на поле, как и в игре, никогда не попадает на мину.
+    Закончившиеся партии при auto_reset сразу начинаются заново.
+    """
+    def __init__(self, batch, rows, cols, mines, seed=None, auto_reset=True):
+        if not 0 <= mines <= rows * cols - 9:
+            raise ValueError(f"на поле {rows}x{cols} нельзя разместить {mines} мин вне окрестности первого клика")
+        self.batch = batch
+        self.rows = rows
+        self.cols = cols
+        self.mines = mines
+        self.size = rows * cols
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+        self.boards = np.arange(batch)
+
+        shape = (batch, self.size)
+        self.mine = np.zeros(shape, dtype=bool)
+        self.adjacent = np.zeros(shape, dtype=np.uint8)
+        self.revealed = np.zeros(shape, dtype=bool)
+        self.flagged = np.zeros(shape, dtype=bool)
+        # Видимые коды клеток обновляются вместе с ходами, поэтому наблюдение не пересчитывается
+        self.codes = np.full(shape, UNKNOWN, dtype=np.uint8)
+        self.placed = np.zeros(batch, dtype=bool)     # мины расставлены (первый ход сделан)
+        self.done = np.zeros(batch, dtype=bool)       # партия закончилась (только без auto_reset)
+        self.revealed_safe = np.zeros(batch, dtype=np.int32)
+        self.flagged_cells = np.zeros(batch, dtype=np.int32)
+        self.steps = 0
+        self.games = 0
+        self.wins = 0
+
+    def reset(self, boards=None):
+        """Начинает заново партии на полях boards (по умолчанию на всех) и возвращает наблюдение"""
+        self.clear(self.boards if boards is None else boards)
+        return self.observe()
+
+    def clear(self, boards):
+        self.codes[boards] = UNKNOWN
+        self.mine[boards] = False
+        self.revealed[boards] = False
+        self.flagged[boards] = False
+        self.placed[boards] = False
+        self.done[boards] = False
+        self.revealed_safe[boards] = 0
+        self.flagged_cells[boards] = 0
+
+    def place_mines(self, boards, first):
+        """
+        Расставляет мины на полях boards так, чтобы клетки first и их соседи остались без мин:
+        каждой клетке дается случайный ключ, запрещенным - заведомо больший,
+        и мины ставятся в mines клеток с наименьшими ключами.
+        """
+        keys = self.rng.random((len(boards), self.size), dtype=np.float32)
+        first_x, first_y = np.divmod(first, self.cols)
+        rows = np.arange(len(boards))
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                x, y = first_x + dx, first_y + dy
+                inside = (x >= 0) & (x < self.rows) & (y >= 0) & (y < self.cols)
+                keys[rows[inside], x[inside] * self.cols + y[inside]] = 2.0
+        mine = np.zeros(keys.shape, dtype=bool)
+        if self.mines:
+            chosen = np.argpartition(keys, self.mines - 1, axis=1)[:, :self.mines]
+            np.put_along_axis(mine, chosen, True, axis=1)
+        self.mine[boards] = mine
+        grid = mine.reshape(-1, self.rows, self.cols)
+        self.adjacent[boards] = count_neighbors(grid).reshape(len(boards), self.size)
+        self.placed[boards] = True
+
+    def flood(self, boards):
+        """
+        Открывает области пустых клеток на полях boards (см. spread).
+        Поля шириной до 64 клеток обрабатываются упакованными в биты строками.
+        Возвращает число открытых клеток на каждом поле.
+        """
+        shape = (len(boards), self.rows, self.cols)
+        revealed = self.revealed[boards].reshape(shape)
+        before = revealed.sum(axis=(1, 2))
+        closed = ~self.flagged[boards].reshape(shape)
+        zero = (self.adjacent[boards] == 0).reshape(shape)
+        if self.cols <= 64:
+            revealed = spread(pack_rows(revealed), pack_rows(closed), pack_rows(zero), dilate_rows)
+            revealed = unpack_rows(revealed, self.cols)
+        else:
+            revealed = spread(revealed, closed, zero, dilate)
+        revealed = revealed.reshape(len(boards), self.size)
+        self.revealed[boards] = revealed
+        self.codes[boards] = np.where(revealed, self.adjacent[boards], self.codes[boards])
+        return revealed.sum(axis=1) - before
+
+    def step(self, actions):
+        """
+        Делает по ходу на каждом поле. Ходы в открытые клетки, открытие флажка
+        и ходы на закончившихся полях ничего не меняют.
+        Возвращает (наблюдение, награда, конец партии, info): награда +1 за победу, -1 за проигрыш,
+        иначе 0; info['won'] и info['lost'] - маски закончившихся партий,
+        info['opened'] - сколько клеток открыто на каждом поле этим ходом.
+        """
+        actions = np.asarray(actions)
+        cells = actions % self.size
+        flag = (actions >= self.size) & ~self.done
+        reveal = (actions < self.size) & ~self.done
+
+        boards, cells_flag = self.boards[flag], cells[flag]
+        allowed = ~self.revealed[boards, cells_flag]
+        boards, cells_flag = boards[allowed], cells_flag[allowed]
+        flagged = ~self.flagged[boards, cells_flag]
+        self.flagged[boards, cells_flag] = flagged
+        self.codes[boards, cells_flag] = np.where(flagged, FLAG, UNKNOWN).astype(np.uint8)
+        self.flagged_cells[boards] += np.where(flagged, 1, -1).astype(np.int32)
+
+        boards, cells = self.boards[reveal], cells[reveal]
+        allowed = ~self.revealed[boards, cells] & ~self.flagged[boards, cells]
+        boards, cells = boards[allowed], cells[allowed]
+        first = ~self.placed[boards]
+        if first.any():
+            self.place_mines(boards[first], cells[first])
+        hit = self.mine[boards, cells]
+        lost = np.zeros(self.batch, dtype=bool)
+        lost[boards[hit]] = True
+        boards, cells = boards[~hit], cells[~hit]
+        self.revealed[boards, cells] = True
+        self.codes[boards, cells] = self.adjacent[boards, cells]
+        opened = np.zeros(self.batch, dtype=np.int32)
+        opened[boards] = 1
+        zero = self.adjacent[boards, cells] == 0
+        if zero.any():
+            opened[boards[zero]] += self.flood(boards[zero]).astype(np.int32)
+        self.revealed_safe += opened
+
+        won = (self.revealed_safe == self.size - self.mines) & (opened > 0)
+        done = won | lost
+        reward = won.astype(np.float32) - lost.astype(np.float32)
+        self.steps += int(flag.sum() + reveal.sum())
+        self.games += int(done.sum())
+        self.wins += int(won.sum())
+        if self.auto_reset:
+            if done.any():
+                self.clear(self.boards[done])
+        else:
+            self.done |= done
+        return self.observe(), reward, done, {'won': won, 'lost': lost, 'opened': opened}
+
+    def observe(self):
+        """
+        Коды клеток (B, строки, столбцы) как в patterns: 0-8 - открытое число, FLAG или UNKNOWN.
+        Это представление внутреннего массива без копирования: следующий step() его изменит.
+        """
+        return self.codes.reshape(self.batch, self.rows, self.cols)
+
+    def planes(self, codes=None):
+        """
+        Тензор наблюдений (B, PLANES, строки, столбцы) из нулей и единиц:
+        каналы 0-8 - открытое число, UNKNOWN_PLANE - неоткрытые клетки без флажка, FLAG_PLANE - флажки.
+        """
+        if codes is None:
+            codes = self.observe()
+        planes = np.zeros((self.batch, PLANES, self.rows, self.cols), dtype=np.float32)
+        planes[:, :UNKNOWN_PLANE] = codes[:, None] == np.arange(UNKNOWN_PLANE, dtype=np.uint8)[:, None, None]
+        planes[:, UNKNOWN_PLANE] = codes == UNKNOWN
+        planes[:, FLAG_PLANE] = codes == FLAG
+        return planes
+
+    def random_actions(self):
+        """
+        Открытие случайной неоткрытой клетки без флажка на каждом поле (простой агент для сравнения).
+        Сначала клетки выбираются наугад с повтором для занятых, оставшимся полям - выбор среди всех неоткрытых.
+        """
+        actions = self.rng.integers(self.size, size=self.batch)
+        for _ in range(8):
+            taken = self.codes[self.boards, actions] != UNKNOWN
+            if not taken.any():
+                return actions
+            actions[taken] = self.rng.integers(self.size, size=int(taken.sum()))
+        boards = self.boards[self.codes[self.boards, actions] != UNKNOWN]
+        keys = self.rng.random((len(boards), self.size), dtype=np.float32)
+        keys[self.codes[boards] != UNKNOWN] = -1.0
+        actions[boards] = keys.argmax(axis=1)
+        return actions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замер скорости пакетной среды на случайном агенте")
+    parser.add_argument('-b', '--batch', type=int, default=1024, help="полей в пакете")
+    parser.add_argument('-p', '--preset', choices=list(DIFFICULTIES), default="Сложный")
+    parser.add_argument('-s', '--size', type=parse_size, help="произвольное поле СТРОКИxСТОЛБЦЫxМИНЫ")
+    parser.add_argument('-n', '--steps', type=int, default=200, help="вызовов step")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rows, cols, mines = args.size[1] if args.size else DIFFICULTIES[args.preset]
+    env = BatchEnv(args.batch, rows, cols, mines, args.seed)
+    step_time = 0.0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        actions = env.random_actions()
+        step_start = time.perf_counter()
+        env.step(actions)
+        step_time += time.perf_counter() - step_start
+    elapsed = time.perf_counter() - start
+    print(f"Поле {rows}x{cols}x{mines}, полей в пакете: {args.batch}, ходов: {env.steps}, "
+          f"партий: {env.games} (побед {env.wins}); step: {env.steps / step_time:.0f} ходов/с, "
+          f"вместе с агентом: {env.steps / elapsed:.0f} ходов/с", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
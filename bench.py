@@ -0,0 +1,364 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from ai import AIHelper
+from board import DIFFICULTIES, Board, parse_size
+from experience import RECORD, STATS_KEY, ExperienceStore, ExperienceTable
+from replay import ai_move
+from simulate import percentile
+
+try:
+    import resource
+except ImportError:  # Windows: пиковый размер процесса не сообщается
+    resource = None
+
+# Большие поля, которые проверяются вместе со сложностями игры, и замеры на них
+# (партии ИИ на самых больших полях идут минутами, поэтому там замеряется только движок)
+LARGE_SIZES = {
+    "100x100x2000": None,
+    "500x500x37500": ('generation', 'reveal'),
+}
+# Замеры хранилища опыта - не зависят от поля
+EXPERIENCE_BENCHMARKS = ['experience.save', 'experience.load', 'experience.open', 'experience.lookup']
+# Допустимое замедление относительно базовых результатов
+THRESHOLD = 0.2
+
+
+def corpus(rows, cols, mines, seeds):
+    """Поля с расставленными минами для зерен seeds; первый клик всегда в центр, как в simulate"""
+    boards = []
+    for seed in seeds:
+        board = Board(rows, cols, mines, seed)
+        board.place_mines(rows // 2, cols // 2)
+        board.first_click = False
+        boards.append(board)
+    return boards
+
+
+def bench_generation(rows, cols, mines, seeds):
+    """Создание поля и расстановка мин"""
+    times = []
+    for seed in seeds:
+        start = time.perf_counter()
+        board = Board(rows, cols, mines, seed)
+        board.place_mines(rows // 2, cols // 2)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_reveal(rows, cols, mines, seeds):
+    """
+    Открытие клеток: сначала заливка от центра, затем все остальные безопасные клетки
+    в случайном (по зерну поля) порядке. Замеряется каждый вызов, который что-то открыл.
+    """
+    times = []
+    for board in corpus(rows, cols, mines, seeds):
+        cells = [i for i in range(board.size) if not board.mine[i]]
+        random.Random(board.seed).shuffle(cells)
+        cells.insert(0, (rows // 2) * cols + cols // 2)
+        for i in cells:
+            if board.revealed[i]:
+                continue
+            start = time.perf_counter()
+            board.reveal_cell(*divmod(i, cols))
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def make_ai(directory):
+    """ИИ без накопленного опыта, чтобы замеры не зависели от журнала и старого JSON-файла на диске"""
+    return AIHelper(experience_path=os.path.join(directory, 'ai_experience.log'), learn=False, legacy_path=None)
+
+
+def bench_hint(rows, cols, mines, seeds):
+    """Подсказка ИИ (как по кнопке 🤖) на каждом ходу партии, которую ИИ играет сам"""
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        ai = make_ai(directory)
+        for board in corpus(rows, cols, mines, seeds):
+            ai.rng.seed(board.seed)
+            ai.set_field(board, rows, cols)
+            changed = board.reveal_cell(rows // 2, cols // 2)
+            ai.set_field(board, rows, cols, changed)
+            while not board.game_over and not board.check_win():
+                start = time.perf_counter()
+                action, move = ai_move(ai, board)
+                times.append(time.perf_counter() - start)
+                if action == 'f':
+                    board.toggle_flag(*move)
+                    changed = [board.index(*move)]
+                elif board.is_revealed(*move) or board.is_flagged(*move):
+                    break
+                else:
+                    changed = board.click(*move)
+                ai.set_field(board, rows, cols, changed)
+    return times
+
+
+def bench_game(rows, cols, mines, seeds):
+    """Целая партия ИИ без интерфейса (simulate.play_game)"""
+    from simulate import play_game
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        ai = make_ai(directory)
+        for seed in seeds:
+            start = time.perf_counter()
+            play_game(ai, rows, cols, mines, seed)
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def experience_records(count, seed):
+    """Записи журнала опыта со случайными (по зерну) ключами паттернов"""
+    rng = random.Random(seed)
+    records = [RECORD.pack(rng.getrandbits(40), rng.randint(-1, 1), rng.randint(-1, 1), 1)
+               for _ in range(count)]
+    records.append(RECORD.pack(STATS_KEY, 1, 0, count))
+    return records
+
+
+def bench_experience_save(records, seed):
+    """Сброс на диск пачек по flush_every записей в растущий журнал"""
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        store = ExperienceStore(os.path.join(directory, 'ai_experience.log'), legacy_path=None)
+        data = experience_records(records, seed)
+        for k in range(0, len(data), store.flush_every):
+            store.pending = data[k:k + store.flush_every]
+            start = time.perf_counter()
+            store.flush()
+            times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_experience_load(records, seed, repeats=5):
+    """Первое открытие таблицы опыта над журналом из records записей без индекса: чтение журнала и построение индекса"""
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        store = ExperienceStore(os.path.join(directory, 'ai_experience.log'), legacy_path=None)
+        store.pending = experience_records(records, seed)
+        store.flush()
+        for _ in range(repeats):
+            if os.path.exists(store.index_path):
+                os.remove(store.index_path)
+            start = time.perf_counter()
+            table = ExperienceTable(store)
+            table.open()
+            times.append(time.perf_counter() - start)
+            table.close()
+    return times
+
+
+def indexed_store(directory, records, seed):
+    """Журнал из records записей; первое открытие таблицы строит индекс, если записей больше REINDEX_RECORDS"""
+    store = ExperienceStore(os.path.join(directory, 'ai_experience.log'), legacy_path=None)
+    store.pending = experience_records(records, seed)
+    store.flush()
+    ExperienceTable(store).open()
+    return store
+
+
+def bench_experience_open(records, seed, repeats=20):
+    """Открытие таблицы опыта ИИ поверх индекса (то, что ИИ делает при первом обращении к опыту)"""
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        store = indexed_store(directory, records, seed)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            table = ExperienceTable(store)
+            table.open()
+            times.append(time.perf_counter() - start)
+            table.close()
+    return times
+
+
+def bench_experience_lookup(records, seed, lookups=20000):
+    """Поиск паттернов в таблице опыта: ключи берутся из журнала, большинство поисков - промахи кэша"""
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        store = indexed_store(directory, records, seed)
+        keys = [key for key, dx, dy, count in store.read_records() if key != STATS_KEY]
+        table = ExperienceTable(store)
+        table.open()
+        rng = random.Random(seed)
+        for _ in range(lookups):
+            key = rng.choice(keys)
+            start = time.perf_counter()
+            table.get(key)
+            times.append(time.perf_counter() - start)
+        table.close()
+    return times
+
+
+BENCHMARKS = {
+    'generation': bench_generation,
+    'reveal': bench_reveal,
+    'hint': bench_hint,
+    'game': bench_game,
+    'experience.save': bench_experience_save,
+    'experience.load': bench_experience_load,
+    'experience.open': bench_experience_open,
+    'experience.lookup': bench_experience_lookup,
+}
+
+
+def peak_memory(function, *args):
+    """Пик выделенной Python памяти за один запуск замера (в КиБ); отдельно от замеров времени"""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def summarize(times, memory):
+    """Сводка по замерам: количество, операций в секунду и задержки в мс"""
+    total = sum(times)
+    ms = [t * 1000 for t in times]
+    return {
+        'count': len(times),
+        'total_s': round(total, 6),
+        'ops_per_s': round(len(times) / total, 1) if total else 0.0,
+        'p50_ms': round(percentile(ms, 0.5), 6),
+        'p95_ms': round(percentile(ms, 0.95), 6),
+        'p99_ms': round(percentile(ms, 0.99), 6),
+        'max_ms': round(max(ms, default=0.0), 6),
+        'peak_kib': memory,
+    }
+
+
+def run(function, args, memory):
+    times = function(*args)
+    return summarize(times, peak_memory(function, *memory) if memory else None)
+
+
+def max_rss_kib():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS сообщает байты, Linux - килобайты
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Сравнивает результаты с базовыми: медианная задержка и пик памяти
+    не должны вырасти больше чем на threshold.
+    Возвращает список строк с регрессиями.
+    """
+    regressions = []
+    for name, current in results['benchmarks'].items():
+        base = baseline['benchmarks'].get(name)
+        if base is None:
+            continue
+        for metric in ('p50_ms', 'peak_kib'):
+            old, new = base.get(metric), current.get(metric)
+            if old and new and new > old * (1 + threshold):
+                regressions.append(f"{name}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_summary(results, baseline, out):
+    for name, stats in results['benchmarks'].items():
+        line = (f"{name}: {stats['count']} замеров, {stats['ops_per_s']:.1f} оп/с, "
+                f"p50 {stats['p50_ms']:.3f} мс, p95 {stats['p95_ms']:.3f} мс, "
+                f"p99 {stats['p99_ms']:.3f} мс, max {stats['max_ms']:.3f} мс")
+        if stats['peak_kib'] is not None:
+            line += f", память {stats['peak_kib']:.0f} КиБ"
+        base = baseline['benchmarks'].get(name) if baseline else None
+        if base and base['p50_ms']:
+            line += f" (p50 к базовому {(stats['p50_ms'] / base['p50_ms'] - 1) * 100:+.1f}%)"
+        print(line, file=out)
+    if results['max_rss_kib'] is not None:
+        print(f"Пиковый размер процесса: {results['max_rss_kib'] / 1024:.1f} МиБ", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры скорости движка поля и ИИ на фиксированных полях")
+    parser.add_argument('-b', '--benchmark', action='append', choices=list(BENCHMARKS),
+                        help="замер (по умолчанию все)")
+    parser.add_argument('-p', '--preset', action='append', choices=list(DIFFICULTIES),
+                        help="сложность из игры (по умолчанию все)")
+    parser.add_argument('-s', '--size', action='append', type=parse_size,
+                        help=f"большое поле СТРОКИxСТОЛБЦЫxМИНЫ (по умолчанию {', '.join(LARGE_SIZES)})")
+    parser.add_argument('-n', '--boards', type=int, default=20, help="полей на каждую сложность")
+    parser.add_argument('--large-boards', type=int, default=1, help="полей на каждое большое поле")
+    parser.add_argument('--records', type=int, default=200000, help="записей в журнале опыта")
+    parser.add_argument('--seed', type=int, default=0, help="базовое зерно, поле i создается с зерном seed + i")
+    parser.add_argument('--no-memory', action='store_true', help="не замерять память (tracemalloc)")
+    parser.add_argument('-o', '--output', help="файл для результатов в JSON (по умолчанию stdout)")
+    parser.add_argument('--baseline', help="базовые результаты для сравнения")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="допустимое замедление относительно базовых результатов (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    selected = args.benchmark or list(BENCHMARKS)
+    # Без -p и -s проверяются все сложности и большие поля LARGE_SIZES
+    default = not args.preset and not args.size
+    sizes = [(name, DIFFICULTIES[name], args.boards, None)
+             for name in (DIFFICULTIES if default else args.preset or [])]
+    if default:
+        sizes += [parse_size(text) + (args.large_boards, only) for text, only in LARGE_SIZES.items()]
+    else:
+        sizes += [(name, size, args.large_boards, None) for name, size in args.size or []]
+
+    benchmarks = {}
+    start = time.perf_counter()
+    for bench in selected:
+        if bench in EXPERIENCE_BENCHMARKS:
+            bench_args = (args.records, args.seed)
+            memory = None if args.no_memory else bench_args
+            benchmarks[f"{bench}/{args.records}"] = run(BENCHMARKS[bench], bench_args, memory)
+            continue
+        for name, (rows, cols, mines), count, only in sizes:
+            if only is not None and bench not in only:
+                continue
+            seeds = range(args.seed, args.seed + count)
+            memory = None if args.no_memory else (rows, cols, mines, seeds[:1])
+            benchmarks[f"{bench}/{name}"] = run(BENCHMARKS[bench], (rows, cols, mines, seeds), memory)
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'seed': args.seed,
+            'boards': args.boards,
+            'large_boards': args.large_boards,
+            'records': args.records,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'elapsed_s': round(time.perf_counter() - start, 3),
+        },
+        'max_rss_kib': max_rss_kib(),
+        'benchmarks': benchmarks,
+    }
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_summary(results, baseline, sys.stderr)
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"Регрессия: {line}", file=sys.stderr)
+    print(f"Регрессий: {len(regressions)}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
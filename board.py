@@ -0,0 +1,424 @@
+import argparse
+import functools
+import itertools
+import random
+from profiling import profiler
+
+# Настройки сложности: строки, столбцы, мины
+DIFFICULTIES = {
+    "Легкий": (9, 9, 10),
+    "Средний": (16, 16, 40),
+    "Сложный": (16, 30, 99)
+}
+
+
+def parse_size(text):
+    """Разбирает размер поля вида 100x100x2000 (строки x столбцы x мины)"""
+    try:
+        rows, cols, mines = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидается формат СТРОКИxСТОЛБЦЫxМИНЫ, получено {text!r}")
+    if rows < 1 or cols < 1 or not 0 <= mines <= rows * cols - 9:
+        raise argparse.ArgumentTypeError(f"некорректный размер поля {text!r}")
+    return f"{rows}x{cols}x{mines}", (rows, cols, mines)
+
+
+# Поля не больше стольких клеток хранят соседей кортежами и держатся в кэше таблиц;
+# у больших полей соседи считаются на лету, чтобы таблица не занимала памяти на каждую клетку
+TABLE_CELLS = 1 << 14
+
+
+class NeighborTable:
+    """
+    Соседи всех клеток поля заданного размера.
+    neighbors[i] - кортеж индексов соседей клетки i (без нее самой). У небольших полей
+    кортежи посчитаны заранее, у полей больше TABLE_CELLS клеток вычисляются при обращении
+    (см. NeighborOffsets).
+    Подсчет соседей сразу для всех клеток (count) сделан сверткой 3x3 над массивом
+    по байту на клетку: массив читается как одно большое целое число, сдвиг на 8 бит -
+    сдвиг на одну клетку. Суммы не превышают 9, поэтому байты не переполняются.
+    """
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+        if self.size > TABLE_CELLS:
+            self.neighbors = NeighborOffsets(rows, cols)
+        else:
+            self.neighbors = list(map(NeighborOffsets(rows, cols).__getitem__, range(self.size)))
+        # Маски для свертки: единицы во всех клетках, кроме первого или последнего столбца
+        ones_row = b'\x01' * cols
+        self.ones = int.from_bytes(ones_row * rows, 'little')
+        self.not_first_col = int.from_bytes((b'\x00' + ones_row[1:]) * rows, 'little')
+        self.not_last_col = int.from_bytes((ones_row[:-1] + b'\x00') * rows, 'little')
+        self.row_shift = 8 * cols
+
+    def count(self, mask):
+        """
+        Для каждой клетки считает соседей, у которых в mask стоит 1.
+        mask - bytes/bytearray из нулей и единиц по байту на клетку.
+        Возвращает bytearray с количеством таких соседей.
+        """
+        return bytearray(self.count_int(int.from_bytes(mask, 'little')).to_bytes(self.size, 'little'))
+
+    def count_int(self, m):
+        """То же, что count, для маски в виде целого числа (байт на клетку)"""
+        # Свертка по строке: сама клетка и соседи слева и справа в той же строке
+        row = m + ((m << 8) & self.not_first_col) + ((m >> 8) & self.not_last_col)
+        # Свертка по столбцу и отбрасывание вышедшего за поле
+        total = (row + (row << self.row_shift) + (row >> self.row_shift)) & ((1 << (8 * self.size)) - 1)
+        return total - m
+
+
+class NeighborOffsets:
+    """
+    Соседи клеток поля rows x cols, вычисляемые при обращении: [i] возвращает тот же кортеж,
+    что и заранее посчитанная таблица (строки сверху вниз, столбцы слева направо).
+    У внутренних клеток соседи получаются прибавлением постоянных смещений,
+    границы проверяются только у клеток с края поля. Памяти занимает O(1).
+    """
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        cols = self.cols
+        x, y = divmod(i, cols)
+        if 0 < x < self.rows - 1 and 0 < y < cols - 1:
+            return (i - cols - 1, i - cols, i - cols + 1, i - 1, i + 1, i + cols - 1, i + cols, i + cols + 1)
+        return tuple(nx * cols + ny
+                     for nx in range(max(0, x - 1), min(self.rows, x + 2))
+                     for ny in range(max(0, y - 1), min(cols, y + 2))
+                     if nx != x or ny != y)
+
+
+@functools.lru_cache(maxsize=16)
+def cached_table(rows, cols):
+    return NeighborTable(rows, cols)
+
+
+def neighbor_table(rows, cols):
+    """
+    Таблица соседей для поля rows x cols. Таблицы небольших полей общие для всех полей
+    этого размера и живут в кэше; большие строятся для каждого поля и в кэше не держатся.
+    """
+    if rows * cols > TABLE_CELLS:
+        return NeighborTable(rows, cols)
+    return cached_table(rows, cols)
+
+
+class Board:
+    """
+    Игровое поле Сапера без графического интерфейса.
+    Все состояние хранится в плоских массивах по одному байту на клетку,
+    индекс клетки (x, y) равен x * cols + y.
+    """
+    def __init__(self, rows, cols, mines, seed=None):
+        self.rows = rows    # Количество строк в поле
+        self.cols = cols    # Количество столбцов в поле
+        self.mines = mines  # Количество мин
+        # У каждой партии свой генератор: по зерну и первому клику расстановка мин повторяется
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.size = rows * cols
+        # Плоские массивы состояния клеток
+        self.mine = bytearray(self.size)      # 1 - в клетке мина
+        self.adjacent = bytearray(self.size)  # количество мин вокруг клетки
+        self.revealed = bytearray(self.size)  # 1 - клетка открыта
+        self.flagged = bytearray(self.size)   # 1 - на клетке флажок
+        self.mine_cells = []                  # индексы клеток с минами, по возрастанию
+        # Игровые переменные
+        self.game_over = False
+        self.first_click = True
+        # Счетчики, которые обновляются при каждом ходе, чтобы проверки были O(1)
+        self.flagged_cells = 0   # флажков на поле
+        self.correct_flags = 0   # флажков на минах
+        self.revealed_safe = 0   # открытых клеток без мин
+
+    @functools.cached_property
+    def table(self):
+        """
+        Таблица соседей поля. Строится при первом обращении (обычно на первом клике),
+        поэтому новое поле создается быстро даже при большом размере.
+        """
+        return neighbor_table(self.rows, self.cols)
+
+    def copy(self):
+        """
+        Копия поля для работы в другом потоке.
+        Копируются только изменяемые в игре массивы (открытые клетки и флажки),
+        мины и числа после расстановки не меняются и остаются общими.
+        """
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.revealed = bytearray(self.revealed)
+        board.flagged = bytearray(self.flagged)
+        return board
+
+    def __getstate__(self):
+        # Таблица соседей общая для полей одного размера - в копию для другого процесса не кладем
+        state = self.__dict__.copy()
+        state.pop('table', None)
+        return state
+
+    def reset(self):
+        """Закрывает все клетки и снимает флажки, расстановка мин сохраняется"""
+        self.revealed[:] = bytes(self.size)
+        self.flagged[:] = bytes(self.size)
+        self.game_over = False
+        self.flagged_cells = 0
+        self.correct_flags = 0
+        self.revealed_safe = 0
+
+    def index(self, x, y):
+        """Возвращает индекс клетки (x, y) в плоских массивах"""
+        return x * self.cols + y
+
+    def is_mine(self, x, y):
+        return bool(self.mine[x * self.cols + y])
+
+    def is_revealed(self, x, y):
+        return bool(self.revealed[x * self.cols + y])
+
+    def is_flagged(self, x, y):
+        return bool(self.flagged[x * self.cols + y])
+
+    def adjacent_mines(self, x, y):
+        return self.adjacent[x * self.cols + y]
+
+    def place_mines(self, first_x, first_y):
+        """
+        Расставляет мины случайным образом.
+        Клетка первого клика и ее соседи всегда остаются без мин.
+        Мины выбираются сразу из разрешенных клеток (random.sample по индексам),
+        поэтому время не зависит от плотности мин.
+        """
+        with profiler.stage('board.place_mines'):
+            first = first_x * self.cols + first_y
+            excluded = set(self.table.neighbors[first] + (first,))
+            allowed = self.size - len(excluded)
+            if not 0 <= self.mines <= allowed:
+                raise ValueError(f"на поле {self.rows}x{self.cols} нельзя разместить {self.mines} мин "
+                                 f"вне окрестности первого клика")
+            # Выбираем номера из первых allowed индексов; запрещенные клетки среди них
+            # заменяются разрешенными клетками из хвоста поля
+            tail = (i for i in range(allowed, self.size) if i not in excluded)
+            remap = dict(zip(sorted(i for i in excluded if i < allowed), tail))
+            # При большой плотности выбираем не мины, а свободные клетки - их меньше
+            fill = self.mines * 2 > allowed
+            chosen = self.rng.sample(range(allowed), allowed - self.mines if fill else self.mines)
+            mine = self.mine
+            if fill:
+                mine[:] = b'\x01' * self.size
+                for i in excluded:
+                    mine[i] = 0
+            value = 0 if fill else 1
+            get = remap.get
+            for i in chosen:
+                mine[get(i, i)] = value
+            self.update_mines()
+
+    @property
+    def mine_positions(self):
+        """Координаты (x, y) всех мин за O(мин) - по списку, собранному при расстановке"""
+        cols = self.cols
+        return [divmod(i, cols) for i in self.mine_cells]
+
+    def mine_indices(self):
+        """Индексы клеток с минами по возрастанию"""
+        return list(self.mine_cells)
+
+    def set_layout(self, mine_indices):
+        """Расставляет мины по готовому списку индексов (например, при повторе записанной партии)"""
+        for i in mine_indices:
+            self.mine[i] = 1
+        self.update_mines()
+        self.first_click = False
+
+    def update_mines(self):
+        """
+        Пересчитывает все, что зависит от расстановки мин, после ее изменения:
+        числа вокруг клеток, список мин и счетчик флажков на минах
+        (флажки могли стоять еще до первого клика, когда мин не было).
+        """
+        self.calculate_adjacent_mines()
+        self.mine_cells = list(itertools.compress(range(self.size), self.mine))
+        both = int.from_bytes(self.mine, 'little') & int.from_bytes(self.flagged, 'little')
+        self.correct_flags = bin(both).count('1')
+
+    def calculate_adjacent_mines(self):
+        """Считает мины вокруг каждой клетки сверткой по всему полю; у самих мин остается 0"""
+        m = int.from_bytes(self.mine, 'little')
+        # m * 255 - маска из байтов 0xFF на месте мин: обнуляет их счетчики одной операцией
+        counts = self.table.count_int(m) & ~(m * 255)
+        self.adjacent = bytearray(counts.to_bytes(self.size, 'little'))
+
+    def click(self, x, y):
+        """
+        Обрабатывает открытие клетки игроком.
+        Первый клик расставляет мины, попадание в мину завершает игру.
+        Возвращает список индексов клеток, открытых этим ходом.
+        """
+        i = x * self.cols + y
+        if self.game_over or self.flagged[i]:
+            return []
+
+        if self.first_click:
+            self.first_click = False
+            self.place_mines(x, y)
+
+        if self.mine[i]:
+            self.game_over = True
+            return []
+
+        return self.reveal_cell(x, y)
+
+    def reveal_cell(self, x, y):
+        """
+        Открывает клетку, а если вокруг нее нет мин - всю связную область
+        пустых клеток вместе с ее числовой границей.
+        Заливка итеративная, поэтому не упирается в предел рекурсии.
+        Возвращает список индексов открытых клеток.
+        """
+        with profiler.stage('board.reveal'):
+            revealed, flagged, adjacent = self.revealed, self.flagged, self.adjacent
+            start = x * self.cols + y
+            if revealed[start] or flagged[start]:
+                return []
+
+            revealed[start] = 1
+            changed = [start]
+            if self.mine[start]:
+                return changed
+            if adjacent[start]:
+                self.revealed_safe += 1
+                return changed
+
+            neighbors = self.table.neighbors
+            append = changed.append
+            stack = [start]
+            push = stack.append
+            if isinstance(neighbors, NeighborOffsets):
+                # Большое поле: соседи внутренних клеток считаются прямо здесь постоянными смещениями,
+                # через NeighborOffsets идут только клетки с края поля
+                cols = self.cols
+                last_col = cols - 1
+                last_row = self.size - cols
+                while stack:
+                    i = stack.pop()
+                    if cols <= i < last_row and 0 < i % cols < last_col:
+                        up, down = i - cols, i + cols
+                        around = (up - 1, up, up + 1, i - 1, i + 1, down - 1, down, down + 1)
+                    else:
+                        around = neighbors[i]
+                    for n in around:
+                        if revealed[n] or flagged[n]:
+                            continue
+                        revealed[n] = 1
+                        append(n)
+                        if not adjacent[n]:
+                            push(n)
+            else:
+                while stack:
+                    for n in neighbors[stack.pop()]:
+                        if revealed[n] or flagged[n]:
+                            continue
+                        # Соседи пустой клетки не могут быть минами
+                        revealed[n] = 1
+                        append(n)
+                        if not adjacent[n]:
+                            push(n)
+            self.revealed_safe += len(changed)
+            return changed
+
+    def chord(self, x, y):
+        """
+        Открывает всех соседей открытого числа, вокруг которого уже стоит столько же флажков.
+        Если флажок стоит неверно, открывается мина и игра заканчивается.
+        Возвращает список индексов открытых клеток.
+        """
+        i = x * self.cols + y
+        if self.game_over or not self.revealed[i] or self.mine[i] or not self.adjacent[i]:
+            return []
+        neighbors = self.table.neighbors[i]
+        flagged, revealed = self.flagged, self.revealed
+        if sum(flagged[n] for n in neighbors) != self.adjacent[i]:
+            return []
+
+        changed = []
+        for n in neighbors:
+            if revealed[n] or flagged[n]:
+                continue
+            if self.mine[n]:
+                # Как и при обычном клике по мине, игра заканчивается
+                self.game_over = True
+                return changed
+            changed += self.reveal_cell(*divmod(n, self.cols))
+        return changed
+
+    def apply(self, moves):
+        """
+        Применяет несколько ходов [(действие, x, y)] как одну операцию.
+        Действия как в записи партии: 'c' - открыть клетку, 'f' - поставить или снять флажок,
+        'h' - аккорд (открыть соседей числа). Ходы проверяются до применения, поэтому
+        ошибка в любом из них не оставляет поле измененным наполовину. Ходы, которые ничего
+        не меняют, пропускаются, после проигрыша остальные ходы не применяются.
+        Возвращает (индексы изменившихся клеток без повторов, список примененных ходов).
+        """
+        moves = list(moves)
+        for action, x, y in moves:
+            if action not in ('c', 'f', 'h'):
+                raise ValueError(f"неизвестное действие {action!r}")
+            if not (0 <= x < self.rows and 0 <= y < self.cols):
+                raise ValueError(f"клетка ({x}, {y}) вне поля {self.rows}x{self.cols}")
+
+        changed = []
+        applied = []
+        for action, x, y in moves:
+            if self.game_over:
+                break
+            if action == 'c':
+                cells = self.click(x, y)
+            elif action == 'f':
+                cells = [x * self.cols + y] if self.toggle_flag(x, y) else []
+            else:
+                cells = self.chord(x, y)
+            if cells or self.game_over:
+                changed += cells
+                applied.append((action, x, y))
+        return list(dict.fromkeys(changed)), applied
+
+    def toggle_flag(self, x, y):
+        """
+        Ставит или снимает флажок.
+        Возвращает True, если состояние клетки изменилось.
+        """
+        i = x * self.cols + y
+        if self.game_over or self.revealed[i]:
+            return False
+
+        self.flagged[i] ^= 1
+        # Обновляем счетчики флажков
+        delta = 1 if self.flagged[i] else -1
+        self.flagged_cells += delta
+        if self.mine[i]:
+            self.correct_flags += delta
+        return True
+
+    def count_flagged_neighbors(self):
+        """Количество флажков вокруг каждой клетки (bytearray по всему полю)"""
+        return self.table.count(self.flagged)
+
+    def count_unknown_neighbors(self):
+        """Количество неоткрытых клеток без флажка вокруг каждой клетки (bytearray по всему полю)"""
+        known = int.from_bytes(self.revealed, 'little') | int.from_bytes(self.flagged, 'little')
+        counts = self.table.count_int(self.table.ones ^ known)
+        return bytearray(counts.to_bytes(self.size, 'little'))
+
+    def check_win(self):
+        """Победа - открыты все клетки без мин"""
+        return self.revealed_safe == self.size - self.mines
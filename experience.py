@@ -0,0 +1,388 @@
+import ast
+import heapq
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from patterns import FLAG, MINE, UNKNOWN, canonical_pattern, to_canonical
+from profiling import profiler
+
+try:
+    import fcntl
+except ImportError:  # Windows: остается атомарность дозаписи через O_APPEND
+    fcntl = None
+
+# Заголовок файла опыта и формат записи: ключ паттерна, смещение хода (dx, dy), приращение счетчика
+MAGIC = b'MSXP\x00\x00\x00\x02'
+RECORD = struct.Struct('<Qbbi')
+# Служебный ключ для общей статистики: dx = 1 - успешный ход, dx = 0 - неуспешный
+STATS_KEY = 2 ** 64 - 1
+
+# Индекс опыта: заголовок (сигнатура, сколько байт журнала учтено, успешных и неуспешных ходов)
+# и записи RECORD со сложенными счетчиками по возрастанию (ключ, dx, dy)
+INDEX_MAGIC = b'MSXI\x00\x00\x00\x01'
+INDEX_HEADER = struct.Struct('<8sQqq')
+# Сколько записей журнала сверх индекса держать в памяти, прежде чем перестроить индекс
+REINDEX_RECORDS = 65536
+# Сколько паттернов держать в кэше таблицы опыта
+CACHE_SIZE = 4096
+
+# Коды символов старого формата паттернов
+SYMBOLS = {str(n): n for n in range(9)}
+SYMBOLS.update({'M': MINE, 'F': FLAG, 'U': UNKNOWN})
+
+
+def convert_legacy_pattern(codes, dx, dy):
+    """
+    Переводит паттерн старого формата (коды соседей, отсортированных по координатам,
+    без соседей за краем поля) в канонический ключ.
+    У клеток на краю нельзя восстановить, с какой стороны был край,
+    поэтому переносятся только паттерны из 8 соседей.
+    Возвращает (ключ, dx, dy) или None.
+    """
+    if len(codes) != 8:
+        return None
+    key, symmetry = canonical_pattern(codes)
+    return (key,) + to_canonical(symmetry, dx, dy)
+
+
+class ExperienceStore:
+    """
+    Хранилище опыта ИИ в виде журнала фиксированных двоичных записей.
+    Каждый ход - одна запись-приращение, записи копятся в памяти и дописываются
+    в конец файла пачкой (flush), поэтому сохранение не зависит от объема накопленного опыта.
+    Дозапись идет под блокировкой файла, так что несколько процессов симуляции
+    могут писать в один журнал одновременно.
+    Опыт старого формата берется из файла рядом с журналом: ai_experience.log -
+    ai_experience.json (legacy_path=True), из указанного файла или не берется (legacy_path=None).
+    """
+    def __init__(self, path='ai_experience.log', legacy_path=True,
+                 flush_every=256, flush_interval=5.0):
+        self.path = path
+        if legacy_path is True:
+            legacy_path = os.path.splitext(path)[0] + '.json'
+        self.legacy_path = legacy_path
+        self.index_path = os.path.splitext(path)[0] + '.idx'  # отсортированный индекс журнала
+        self.flush_every = flush_every        # Сбрасывать на диск каждые N записей
+        self.flush_interval = flush_interval  # или не реже чем раз в столько секунд
+        self.pending = []
+        self.last_flush = time.monotonic()
+
+    def add_move(self, key, dx, dy, count=1):
+        """Запоминает успешный ход со смещением (dx, dy) для паттерна key"""
+        self.pending.append(RECORD.pack(key, dx, dy, count))
+
+    def add_result(self, was_successful):
+        """Запоминает исход хода для общей статистики"""
+        self.pending.append(RECORD.pack(STATS_KEY, 1 if was_successful else 0, 0, 1))
+
+    def flush_due(self):
+        """Пора ли сбросить накопленные записи на диск"""
+        return len(self.pending) >= self.flush_every or \
+            time.monotonic() - self.last_flush >= self.flush_interval
+
+    def flush(self):
+        """Дописывает накопленные записи в конец журнала одной операцией записи"""
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+        with profiler.stage('experience.flush'):
+            data = b''.join(self.pending)
+            fd = self.open_locked()
+            try:
+                if os.fstat(fd).st_size == 0:
+                    data = MAGIC + data
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        self.pending = []
+
+    def open_locked(self):
+        """
+        Открывает журнал на дозапись под исключительной блокировкой.
+        Если файл журнала заменили, пока ждали блокировку, открывает его заново.
+        """
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            if fcntl is None:
+                return fd
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_ino == os.stat(self.path).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def read_records(self):
+        """Читает все целые записи журнала (обрезанный хвост после сбоя пропускается)"""
+        return self.read_from(len(MAGIC))[0]
+
+    def read_from(self, offset):
+        """
+        Читает целые записи журнала начиная с байта offset.
+        Возвращает (записи, до какого байта журнал прочитан) или (None, 0),
+        если журнал короче offset - значит, его заменили.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_SH)
+                if f.read(len(MAGIC)) != MAGIC:
+                    return [], len(MAGIC)
+                if offset > os.fstat(f.fileno()).st_size:
+                    return None, 0
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], len(MAGIC)
+        usable = len(data) - len(data) % RECORD.size
+        return RECORD.iter_unpack(memoryview(data)[:usable]), offset + usable
+
+    def open_index(self):
+        """
+        Открывает индекс опыта через mmap.
+        Возвращает (mmap, сколько байт журнала учтено, успешных, неуспешных ходов) или None.
+        """
+        try:
+            f = open(self.index_path, 'rb')
+        except FileNotFoundError:
+            return None
+        with f:
+            if os.fstat(f.fileno()).st_size < INDEX_HEADER.size:
+                return None
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, covered, success, failure = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC:
+            data.close()
+            return None
+        return data, covered, success, failure
+
+    def write_index(self, index, tail, covered, success, failure):
+        """
+        Записывает новый индекс: записи старого индекса index (mmap или None) и хвоста tail
+        (ключ -> {(dx, dy) -> количество}) сливаются по порядку, без загрузки индекса в память.
+        Файл заменяется целиком, поэтому читатели видят либо старый, либо новый индекс.
+        """
+        tail_records = sorted((key, dx, dy, count)
+                              for key, moves in tail.items() for (dx, dy), count in moves.items())
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, covered, success, failure))
+            chunk = []
+            last, total = None, 0
+            for key, dx, dy, count in heapq.merge(index_records(index), tail_records):
+                # Одинаковые (ключ, dx, dy) из индекса и хвоста идут подряд - складываем их
+                if (key, dx, dy) == last:
+                    total += count
+                    continue
+                if last is not None:
+                    chunk.append(RECORD.pack(*last, total))
+                    if len(chunk) >= 65536:
+                        f.write(b''.join(chunk))
+                        chunk = []
+                last, total = (key, dx, dy), count
+            if last is not None:
+                chunk.append(RECORD.pack(*last, total))
+            f.write(b''.join(chunk))
+        os.replace(temp_path, self.index_path)
+
+    def prepare(self):
+        """Переносит опыт из старого JSON-файла в журнал, если это еще не сделано"""
+        if not os.path.exists(self.path) and self.legacy_path and os.path.exists(self.legacy_path):
+            self.import_legacy()
+
+    def import_legacy(self):
+        """Переносит опыт из старого формата ai_experience.json"""
+        with open(self.legacy_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for pattern_str, moves in data.get('experience', {}).items():
+            codes = [SYMBOLS[symbol] for symbol in ast.literal_eval(pattern_str)]
+            for move_str, count in moves.items():
+                dx, dy = map(int, move_str.strip('()').split(','))
+                converted = convert_legacy_pattern(codes, dx, dy)
+                if converted:
+                    self.pending.append(RECORD.pack(*converted, count))
+        self.pending.append(RECORD.pack(STATS_KEY, 1, 0, data.get('success_count', 0)))
+        self.pending.append(RECORD.pack(STATS_KEY, 0, 0, data.get('failure_count', 0)))
+        self.flush()
+
+
+def index_records(index):
+    """Записи индекса (ключ, dx, dy, количество) по порядку"""
+    if index is None:
+        return iter(())
+    return RECORD.iter_unpack(memoryview(index)[INDEX_HEADER.size:])
+
+
+def index_lookup(index, key):
+    """Ищет в индексе двоичным поиском ходы паттерна key: {(dx, dy) -> количество}"""
+    count = (len(index) - INDEX_HEADER.size) // RECORD.size
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if RECORD.unpack_from(index, INDEX_HEADER.size + middle * RECORD.size)[0] < key:
+            low = middle + 1
+        else:
+            high = middle
+    moves = {}
+    while low < count:
+        found, dx, dy, n = RECORD.unpack_from(index, INDEX_HEADER.size + low * RECORD.size)
+        if found != key:
+            break
+        moves[(dx, dy)] = n
+        low += 1
+    return moves
+
+
+class ExperienceTable:
+    """
+    Таблица опыта ИИ: ключ паттерна -> {(dx, dy) -> количество успехов}.
+    Опыт не загружается целиком: основная часть лежит в отсортированном индексе на диске,
+    открытом через mmap, и ищется двоичным поиском. Записи журнала, дописанные после
+    построения индекса, и новые ходы держатся в памяти (хвост); когда хвост вырастает
+    больше REINDEX_RECORDS записей, индекс перестраивается вместе с ним.
+    Найденные паттерны хранятся в кэше LRU не больше cache_size штук.
+    Файлы открываются при первом обращении, поэтому создание таблицы ничего не читает.
+    """
+    def __init__(self, store, cache_size=CACHE_SIZE):
+        self.store = store
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # ключ -> ходы, последние использованные в конце
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.opened = False
+        self.index = None
+        self.tail = defaultdict(lambda: defaultdict(int))
+        self.tail_records = 0  # записей журнала и новых ходов в хвосте
+        self.success_count = 0
+        self.failure_count = 0
+
+    def open(self):
+        """Открывает индекс и читает хвост журнала (один раз, при первом обращении)"""
+        with self.lock:
+            if self.opened:
+                return
+            try:
+                with profiler.stage('experience.load'):
+                    self.load()
+            except (OSError, ValueError) as e:
+                print(f"Ошибка при загрузке опыта: {e}")
+            self.opened = True
+
+    def load(self):
+        self.store.prepare()
+        opened = self.store.open_index()
+        covered = len(MAGIC)
+        if opened:
+            index, covered, success, failure = opened
+        records, end = self.store.read_from(covered)
+        if records is None:
+            # Журнал заменили - индекс ему больше не соответствует
+            if opened:
+                index.close()
+            opened = None
+            records, end = self.store.read_from(len(MAGIC))
+        if opened:
+            self.index = index
+            self.success_count += success
+            self.failure_count += failure
+
+        tail = self.tail
+        tail_records = 0
+        for key, dx, dy, count in records:
+            if key == STATS_KEY:
+                if dx:
+                    self.success_count += count
+                else:
+                    self.failure_count += count
+            else:
+                tail[key][(dx, dy)] += count
+                tail_records += 1
+        if tail_records > REINDEX_RECORDS:
+            self.store.write_index(self.index, tail, end, self.success_count, self.failure_count)
+            if self.index is not None:
+                self.index.close()
+            self.index = self.store.open_index()[0]
+            self.tail = defaultdict(lambda: defaultdict(int))
+            tail_records = 0
+        self.tail_records = tail_records
+
+    def reindex_due(self):
+        """Вырос ли хвост больше REINDEX_RECORDS записей"""
+        return self.opened and self.tail_records > REINDEX_RECORDS
+
+    def flushed(self):
+        """
+        Вызывается после сброса журнала на диск. Если хвост вырос больше REINDEX_RECORDS записей,
+        таблица открывается заново: журнал, до конца которого дошел сброс, уже содержит
+        все ходы хвоста, поэтому индекс перестраивается по нему, а хвост освобождается.
+        """
+        if self.reindex_due():
+            self.close()
+            self.open()
+
+    def get(self, key):
+        """Ходы паттерна key {(dx, dy) -> количество} или None, если опыта по нему нет"""
+        if not self.opened:
+            self.open()
+        moves = self.cache.get(key)
+        if moves is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return moves or None
+        self.misses += 1
+        moves = index_lookup(self.index, key) if self.index is not None else {}
+        for move, count in self.tail.get(key, {}).items():
+            moves[move] = moves.get(move, 0) + count
+        self.cache[key] = moves
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+        return moves or None
+
+    def add(self, key, dx, dy, count=1):
+        """Добавляет успешный ход в хвост таблицы (на диск его пишет журнал)"""
+        if not self.opened:
+            self.open()
+        self.tail[key][(dx, dy)] += count
+        self.tail_records += 1
+        moves = self.cache.get(key)
+        if moves is not None:
+            moves[(dx, dy)] = moves.get((dx, dy), 0) + count
+
+    def add_result(self, was_successful):
+        if not self.opened:
+            self.open()
+        if was_successful:
+            self.success_count += 1
+        else:
+            self.failure_count += 1
+
+    def counts(self):
+        """(успешных ходов, неуспешных ходов)"""
+        if not self.opened:
+            self.open()
+        return self.success_count, self.failure_count
+
+    def close(self):
+        """Закрывает индекс; следующее обращение откроет таблицу заново"""
+        with self.lock:
+            if self.index is not None:
+                self.index.close()
+            self.index = None
+            self.cache.clear()
+            self.tail = defaultdict(lambda: defaultdict(int))
+            self.tail_records = 0
+            self.success_count = self.failure_count = 0
+            self.opened = False
+
+    def cache_stats(self):
+        """Счетчики кэша: попадания, промахи, вытеснения и заполненность"""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self.cache), 'capacity': self.cache_size}
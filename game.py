@@ -1,40 +1,50 @@
-import random
+import sys
+import time
+STARTED = time.perf_counter()  # От этого момента считается время запуска окна
 import tkinter as tk
 from tkinter import messagebox, ttk
-from ai import AIHelper
-
-class Cell:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.is_mine = False
-        self.adjacent_mines = 0
-        self.is_revealed = False
-        self.is_flagged = False
-        self.button = None
+from board import DIFFICULTIES, Board
+from views import VIEWS
+IMPORTED = time.perf_counter()
+
+# Как часто окно проверяет, готов ли ход ИИ (мс)
+AI_POLL_MS = 5
+# Как часто окно проверяет, появилось ли в пуле поле без угадываний (мс)
+NOGUESS_POLL_MS = 200
+
+# Бюджет времени от запуска до окна, готового принимать клики (мс)
+STARTUP_BUDGET_MS = 200
+# Модули, которые загружаются только при первом обращении, а не при запуске окна
+DEFERRED_MODULES = ('ai', 'experience', 'solver', 'worker', 'noguess', 'replay', 'multiprocessing')
 
 class Minesweeper:
-    def __init__(self, master):
+    def __init__(self, master, view='canvas', size=None, record_path=None):
         self.master = master
+        self.record_path = record_path  # Файл для записи партий (None - не записывать)
+        self.recorder = None
         self.master.title("Minesweeper")
         self.master.configure(bg='gray')
         
-        # Инициализация ИИ
-        self.ai = AIHelper()
+        # ИИ работает в фоновом потоке на копии поля; поток и сам ИИ с его опытом
+        # создаются при первом обращении (🤖, 📊, автоигра), чтобы не задерживать появление окна
+        self.worker = None
+        self.board_version = 0  # Растет при каждом изменении поля
+        self.ai_request = None  # Версия поля, для которой ИИ ищет ход
+        self.ai_changed = None  # Клетки, изменившиеся с прошлого запроса к ИИ (None - новая партия)
+        self.master.protocol("WM_DELETE_WINDOW", self.close)
         
         # Настройки сложности
-        self.difficulties = {
-            "Легкий": (9, 9, 10),
-            "Средний": (16, 16, 40),
-            "Сложный": (16, 30, 99)
-        }
+        self.difficulties = dict(DIFFICULTIES)
+        if size:
+            # Произвольный размер поля из командной строки
+            name, self.difficulties[name] = size
         
         # Создаем верхнюю панель
         self.top_frame = tk.Frame(self.master, bg='gray')
         self.top_frame.pack(padx=10, pady=5)
         
         # Выпадающий список сложности
-        self.difficulty_var = tk.StringVar(value="Легкий")
+        self.difficulty_var = tk.StringVar(value=size[0] if size else "Легкий")
         self.difficulty_menu = ttk.Combobox(
             self.top_frame,
             textvariable=self.difficulty_var,
@@ -80,202 +90,452 @@ class Minesweeper:
         )
         self.mines_label.pack(side=tk.LEFT, padx=5)
         
+        # Панель автоигры: запуск, задержка между пачками ходов и частота перерисовки
+        self.autoplay = False
+        self.pending_draw = set()  # Клетки, изменившиеся с последней перерисовки в автоигре
+        self.autoplay_frame = tk.Frame(self.master, bg='gray')
+        self.autoplay_frame.pack(padx=10)
+        self.autoplay_button = tk.Button(
+            self.autoplay_frame,
+            text="▶",
+            font=('Arial', 12),
+            command=self.toggle_autoplay
+        )
+        self.autoplay_button.pack(side=tk.LEFT, padx=5)
+        
+        # Задержка между пачками ходов; 0 - максимальная скорость
+        self.autoplay_delay = tk.IntVar(value=100)
+        self.delay_scale = tk.Scale(
+            self.autoplay_frame,
+            from_=0,
+            to=1000,
+            resolution=10,
+            orient=tk.HORIZONTAL,
+            variable=self.autoplay_delay,
+            label="Задержка, мс",
+            length=150,
+            bg='gray'
+        )
+        self.delay_scale.pack(side=tk.LEFT, padx=5)
+        
+        # На максимальной скорости поле перерисовывается раз в N пачек
+        tk.Label(self.autoplay_frame, text="Кадр раз в", bg='gray').pack(side=tk.LEFT)
+        self.render_every = tk.IntVar(value=10)
+        self.render_spinbox = tk.Spinbox(
+            self.autoplay_frame,
+            from_=1,
+            to=1000,
+            textvariable=self.render_every,
+            width=4
+        )
+        self.render_spinbox.pack(side=tk.LEFT, padx=5)
+        
+        # Режим без угадываний: поля берутся из заготовленного пула
+        self.noguess_var = tk.BooleanVar(value=False)
+        self.noguess_check = tk.Checkbutton(
+            self.autoplay_frame,
+            text="Без угадываний",
+            variable=self.noguess_var,
+            bg='gray',
+            command=self.restart_game
+        )
+        self.noguess_check.pack(side=tk.LEFT, padx=5)
+        self.pool_filler = None
+        self.pool_stop = None
+        self.waiting_board = None  # Размер поля без угадываний, которого ждет партия
+        
         # Фрейм для игрового поля
         self.button_frame = tk.Frame(self.master, bg='gray')
         self.button_frame.pack(padx=10, pady=5)
         
+        # Отображение поля: один холст (быстро на больших полях) или кнопки на каждую клетку
+        self.view = VIEWS[view](self.button_frame, self.handle_click, self.toggle_flag, self.chord)
+        
         self.start_new_game()
         
     def start_new_game(self):
-        # Очищаем старое игровое поле
-        for widget in self.button_frame.winfo_children():
-            widget.destroy()
-            
+        self.stop_autoplay()
+        self.save_record()
+        
         # Получаем настройки сложности
         difficulty = self.difficulties[self.difficulty_var.get()]
         self.rows, self.cols, self.mines = difficulty
         
-        # Инициализация игровых переменных
-        self.cells = [[Cell(x, y) for y in range(self.cols)] for x in range(self.rows)]
-        self.mine_positions = set()
-        self.game_over = False
-        self.first_click = True
-        self.flagged_cells = 0
-        
-        # Обновляем поле для ИИ
-        self.ai.set_field(self.cells, self.rows, self.cols)
+        # Состояние игры хранится в движке, окно только отображает его
+        first = None
+        self.waiting_board = None
+        noguess_board = self.new_noguess_board() if self.noguess_var.get() else None
+        if noguess_board:
+            self.board, first = noguess_board
+        else:
+            # Пока поле без угадываний генерируется, на его месте закрытое поле, ходы по нему не принимаются
+            self.board = Board(self.rows, self.cols, self.mines)
+        self.ai_changed = None
+        self.board_changed()
+        if self.worker:
+            self.worker.new_game(self.board.seed)
+        if self.record_path:
+            from replay import GameRecorder
+            self.recorder = GameRecorder(self.board)
         
         # Обновляем счетчик мин
         self.update_mines_counter()
         
-        # Создаем новое игровое поле
-        self.create_board()
+        # Готовим игровое поле (холст переиспользует элементы прошлой партии)
+        self.view.build(self.rows, self.cols)
+        self.pending_draw = set()
+        self.frame = 0
+        if first:
+            # Поле без угадываний решается от своего первого клика - делаем его за игрока
+            self.handle_click(*first)
+
+    def new_noguess_board(self):
+        """
+        Берет поле без угадываний из пула и запускает фоновое пополнение пулов для всех сложностей.
+        Возвращает (поле, первый клик) или None: если пул пуст, партия ждет фоновую генерацию
+        (в главном потоке поля не генерируются), а слишком плотные поля играются как обычные.
+        """
+        import noguess
+        if not noguess.can_generate(self.rows, self.cols, self.mines):
+            print("Для такой плотности мин поле без угадываний не сгенерировать - играем обычное")
+            self.noguess_var.set(False)
+            return None
+        self.start_pool_filler()
+        entry = noguess.take_from_pool(self.rows, self.cols, self.mines)
+        if entry is None:
+            print("Генерируем поле без угадываний")
+            self.waiting_board = (self.rows, self.cols, self.mines)
+            self.master.after(NOGUESS_POLL_MS, self.poll_noguess, self.waiting_board)
+            return None
+        return noguess.make_board(entry, self.rows, self.cols, self.mines), entry['first']
+
+    def start_pool_filler(self):
+        """Запускает фоновое пополнение пулов, если оно еще не идет"""
+        import threading
+        import noguess
+        if self.pool_filler is None or not self.pool_filler.is_alive():
+            self.pool_stop = threading.Event()
+            self.pool_filler = noguess.fill_in_background(self.difficulties.values(), stop=self.pool_stop)
+
+    def poll_noguess(self, size):
+        """Ждет, пока фоновая генерация положит в пул поле размера size, и начинает с ним партию"""
+        import noguess
+        if self.waiting_board != size:
+            # Партию уже перезапустили
+            return
+        if noguess.pool_size(*size):
+            # Автоигру, включенную во время ожидания, продолжаем уже на готовом поле
+            autoplay = self.autoplay
+            self.start_new_game()
+            if autoplay:
+                self.toggle_autoplay()
+        elif not self.pool_filler.is_alive():
+            # Генерация закончилась, а поля так и нет - играем обычное
+            print("Не удалось сгенерировать поле без угадываний - играем обычное")
+            self.noguess_var.set(False)
+            self.start_new_game()
+        else:
+            self.master.after(NOGUESS_POLL_MS, self.poll_noguess, size)
         
     def get_ai_help(self):
-        if self.game_over or self.first_click:
+        if self.board.game_over or self.board.first_click:
             print("Игра не началась или закончилась")
             return
-            
-        # Обновляем состояние ИИ перед каждым ходом
-        self.ai.set_field(self.cells, self.rows, self.cols)
-        print("Состояние ИИ обновлено")
-            
-        # Сначала ищем мину
-        mine_move = self.ai.get_mine_move()
-        print(f"Поиск мины: {mine_move}")
-        if mine_move:
-            x, y = mine_move
-            print(f"Найдена мина в позиции ({x}, {y})")
-            if not self.cells[x][y].is_revealed and not self.cells[x][y].is_flagged:
-                print("Ставим флажок")
-                self.ai.learn_from_move(x, y, True)
-                self.toggle_flag(x, y)
-                return
-            
-        # Если не нашли мину, делаем ход
+        if self.ai_request == self.board_version:
+            # ИИ уже ищет ход для этого состояния поля
+            return
+
         print("Ищем ход")
-        move = self.ai.get_safe_move()  # Этот метод теперь всегда возвращает ход
-        print(f"Найден ход: {move}")
+        self.ai_request = self.board_version
+        self.get_worker().request_move(self.board, self.board_version, self.take_ai_changes())
+        self.master.after(AI_POLL_MS, self.poll_ai)
+
+    def poll_ai(self):
+        """Забирает ход из фонового потока ИИ, пока окно продолжает обрабатывать события"""
+        if self.ai_request is None:
+            if self.autoplay:
+                # Запрос автоигры отменили изменением поля - спрашиваем заново
+                self.autoplay_step()
+            return
+        result = self.worker.poll()
+        if result is None:
+            self.master.after(AI_POLL_MS, self.poll_ai)
+            return
+        version, action, move = result
+        if version != self.ai_request:
+            # Ответ на отмененный запрос, ждем актуальный
+            self.master.after(AI_POLL_MS, self.poll_ai)
+            return
+        self.ai_request = None
+        if action == 'error':
+            self.stop_autoplay()
+            return
+        if action == 'batch':
+            # Пачку, пришедшую после паузы, не применяем: поле не должно уходить вперед без игрока
+            if self.autoplay:
+                self.apply_batch(*move)
+            return
+
         x, y = move
-        print(f"Проверяем клетку ({x}, {y})")
-        if not self.cells[x][y].is_revealed and not self.cells[x][y].is_flagged:
-            print("Делаем ход")
-            self.ai.learn_from_move(x, y, True)
-            self.handle_click(x, y)
-        else:
+        print(f"Найден ход: {action} ({x}, {y})")
+        if self.board.is_revealed(x, y) or self.board.is_flagged(x, y):
             print("Клетка уже открыта или помечена флажком")
+            return
+        self.play([('f' if action == 'flag' else 'c', x, y)], learn=True)
+
+    def toggle_autoplay(self):
+        if self.autoplay:
+            self.stop_autoplay()
+            return
+        self.autoplay = True
+        self.autoplay_button.config(text="⏸")
+        self.autoplay_step()
+
+    def stop_autoplay(self):
+        """Останавливает автоигру и дорисовывает клетки, отложенные до следующего кадра"""
+        self.autoplay = False
+        self.autoplay_button.config(text="▶")
+        if self.pending_draw:
+            self.draw_cells(self.pending_draw)
+            self.pending_draw = set()
+            self.update_mines_counter()
+
+    def autoplay_step(self):
+        """Запрашивает у ИИ следующую пачку ходов"""
+        board = self.board
+        if not self.autoplay or board.game_over or (not board.first_click and board.check_win()):
+            self.stop_autoplay()
+            return
+        if board.first_click:
+            # Первый ход всегда безопасен - открываем центр поля
+            self.handle_click(self.rows // 2, self.cols // 2)
+            self.master.after(self.get_autoplay_delay(), self.autoplay_step)
+            return
+        if self.ai_request == self.board_version:
+            return
+        self.ai_request = self.board_version
+        self.get_worker().request_batch(board, self.board_version, self.take_ai_changes())
+        self.master.after(AI_POLL_MS, self.poll_ai)
+
+    def get_autoplay_delay(self):
+        try:
+            return max(0, int(self.autoplay_delay.get()))
+        except (tk.TclError, ValueError):
+            return 0
+
+    def apply_batch(self, safe, mines):
+        """
+        Применяет пачку ходов ИИ одним изменением поля: сначала флажки на мины,
+        потом открытие безопасных клеток. Поле перерисовывается один раз за пачку,
+        а на максимальной скорости - раз в несколько пачек.
+        """
+        moves = [('f', x, y) for x, y in mines] + [('c', x, y) for x, y in safe]
+        changed = self.apply_moves(moves, learn=True)
+
+        self.pending_draw.update(changed)
+        self.frame += 1
+        delay = self.get_autoplay_delay()
+        try:
+            render_every = max(1, int(self.render_every.get()))
+        except (tk.TclError, ValueError):
+            render_every = 1
+        board = self.board
+        if delay or board.game_over or board.check_win() or self.frame % render_every == 0:
+            self.draw_cells(self.pending_draw)
+            self.pending_draw = set()
+            self.update_mines_counter()
+
+        if not self.check_game_end() and self.autoplay:
+            self.master.after(delay, self.autoplay_step)
+
+    def apply_moves(self, moves, learn=False):
+        """
+        Применяет ходы [(действие, x, y)] ('c' - открыть, 'f' - флажок, 'h' - аккорд)
+        одной операцией движка: поле меняет версию один раз, опыт ИИ пополняется одной пачкой.
+        learn=True - ходы сделал ИИ, и в опыт записываются все они, иначе только проигрышный клик.
+        Возвращает список изменившихся клеток.
+        """
+        board = self.board
+        if self.waiting_board:
+            return []
+        changed, applied = board.apply(moves)
+        if not applied:
+            return changed
+        if self.ai_changed is not None:
+            self.ai_changed.update(changed)
+        self.board_changed()
+        for move in applied:
+            self.record_move(*move)
+
+        learned = [(x, y, True) for action, x, y in applied if action != 'h'] if learn else []
+        action, x, y = applied[-1]
+        if board.game_over and action == 'c':
+            # Запоминаем неуспешный ход
+            learned.append((x, y, False))
+        if learned:
+            self.get_worker().learn_moves(learned)
+        return changed
+
+    def play(self, moves, learn=False):
+        """Применяет ходы игрока или подсказки ИИ и сразу показывает результат"""
+        changed = self.apply_moves(moves, learn)
+        self.draw_cells(changed)
+        self.update_mines_counter()
+        self.check_game_end()
+
+    def check_game_end(self):
+        """Сообщает о проигрыше или победе; возвращает True, если партия закончилась"""
+        board = self.board
+        if board.game_over:
+            self.stop_autoplay()
+            self.save_record()
+            self.reveal_all_mines()
+            messagebox.showinfo("Game Over", "You hit a mine!")
+            return True
+        if not board.first_click and board.check_win():
+            self.stop_autoplay()
+            self.save_record()
+            messagebox.showinfo("Congratulations", "You won!")
+            return True
+        return False
+
+    def board_changed(self):
+        """Отмечает изменение поля: незаконченный поиск хода ИИ становится неактуальным"""
+        self.board_version += 1
+        self.ai_request = None
+        if self.worker:
+            self.worker.cancel(self.board_version)
+
+    def take_ai_changes(self):
+        """Забирает клетки, изменившиеся с прошлого запроса к ИИ (None - ИИ строит границу заново)"""
+        changed = self.ai_changed
+        self.ai_changed = set()
+        return changed
+
+    def get_worker(self):
+        """Поток ИИ; при первом обращении запускает его, ИИ и опыт создаются уже в потоке"""
+        if self.worker is None:
+            from worker import AIWorker
+            self.worker = AIWorker()
+            self.worker.new_game(self.board.seed)
+        return self.worker
 
     def restart_game(self):
         self.start_new_game()
         
     def update_mines_counter(self):
-        remaining_mines = self.mines - self.flagged_cells
+        remaining_mines = self.mines - self.board.flagged_cells
         self.mines_label.config(text=f"💣: {remaining_mines}")
         
-    def create_board(self):
-        for x in range(self.rows):
-            for y in range(self.cols):
-                cell = self.cells[x][y]
-                button = tk.Button(
-                    self.button_frame,
-                    width=3,
-                    height=2,
-                    font=('Arial', 12, 'bold'),
-                    bg='lightgray',
-                    relief=tk.RAISED,
-                    command=lambda x=x, y=y: self.handle_click(x, y)
-                )
-                button.bind('<Button-3>', lambda e, x=x, y=y: self.toggle_flag(x, y))
-                button.grid(row=x, column=y, padx=1, pady=1)
-                cell.button = button
-
-    def place_mines(self, first_x, first_y):
-        while len(self.mine_positions) < self.mines:
-            x = random.randint(0, self.rows - 1)
-            y = random.randint(0, self.cols - 1)
-            if (x, y) not in self.mine_positions and \
-               (abs(x - first_x) > 1 or abs(y - first_y) > 1):
-                self.cells[x][y].is_mine = True
-                self.mine_positions.add((x, y))
-        self.calculate_adjacent_mines()
-
-    def calculate_adjacent_mines(self):
-        for x in range(self.rows):
-            for y in range(self.cols):
-                if self.cells[x][y].is_mine:
-                    continue
-                count = 0
-                for dx in [-1, 0, 1]:
-                    for dy in [-1, 0, 1]:
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < self.rows and 0 <= ny < self.cols:
-                            if self.cells[nx][ny].is_mine:
-                                count += 1
-                self.cells[x][y].adjacent_mines = count
-
     def handle_click(self, x, y):
-        if self.game_over or self.cells[x][y].is_flagged:
+        if self.board.game_over or self.board.is_flagged(x, y) or self.board.is_revealed(x, y):
             return
+        self.play([('c', x, y)])
 
-        if self.first_click:
-            self.first_click = False
-            self.place_mines(x, y)
-            # Обновляем состояние ИИ после размещения мин
-            self.ai.set_field(self.cells, self.rows, self.cols)
-
-        if self.cells[x][y].is_mine:
-            self.game_over = True
-            self.reveal_all_mines()
-            # Запоминаем неуспешный ход
-            self.ai.learn_from_move(x, y, False)
-            messagebox.showinfo("Game Over", "You hit a mine!")
+    def chord(self, x, y):
+        """Аккорд: открывает соседей числа, вокруг которого стоит столько же флажков"""
+        if self.board.game_over or not self.board.is_revealed(x, y):
             return
+        self.play([('h', x, y)])
 
-        self.reveal_cell(x, y)
-        # Обновляем состояние ИИ после каждого хода
-        self.ai.set_field(self.cells, self.rows, self.cols)
-        
-        if self.check_win():
-            messagebox.showinfo("Congratulations", "You won!")
+    def record_move(self, action, x, y):
+        if self.recorder:
+            self.recorder.add(action, x, y)
 
-    def reveal_cell(self, x, y):
-        cell = self.cells[x][y]
-        if cell.is_revealed or cell.is_flagged:
-            return
+    def save_record(self):
+        """Дописывает запись текущей партии в файл, если в ней были ходы"""
+        if self.recorder and self.recorder.moves:
+            try:
+                self.recorder.save(self.record_path)
+            except OSError as e:
+                print(f"Ошибка при сохранении записи партии: {e}")
+        self.recorder = None
 
-        cell.is_revealed = True
-        if cell.is_mine:
-            cell.button.config(text="💣", bg="red", relief=tk.SUNKEN)
-        else:
-            if cell.adjacent_mines > 0:
-                cell.button.config(text=str(cell.adjacent_mines), bg="white", relief=tk.SUNKEN)
-            else:
-                cell.button.config(text="", bg="white", relief=tk.SUNKEN)
-                for dx in [-1, 0, 1]:
-                    for dy in [-1, 0, 1]:
-                        nx, ny = x + dx, y + dy
-                        if 0 <= nx < self.rows and 0 <= ny < self.cols:
-                            self.reveal_cell(nx, ny)
+    def draw_cells(self, changed):
+        """Перерисовывает только клетки, изменившиеся за ход"""
+        self.view.draw_cells(self.board, changed)
+
+    def draw_cell(self, i):
+        """Отрисовывает клетку по ее состоянию в движке"""
+        self.view.draw_cell(self.board, i)
 
     def toggle_flag(self, x, y):
-        if self.game_over or self.cells[x][y].is_revealed:
+        if self.board.game_over or self.board.is_revealed(x, y):
             return
-
-        cell = self.cells[x][y]
-        cell.is_flagged = not cell.is_flagged
-        
-        # Обновляем счетчик флажков
-        if cell.is_flagged:
-            self.flagged_cells += 1
-        else:
-            self.flagged_cells -= 1
-            
-        self.update_mines_counter()
-        cell.button.config(text="🚩" if cell.is_flagged else "", bg="lightgray")
-        
-        # Обновляем состояние ИИ после установки флажка
-        self.ai.set_field(self.cells, self.rows, self.cols)
+        self.play([('f', x, y)])
 
     def reveal_all_mines(self):
-        for x in range(self.rows):
-            for y in range(self.cols):
-                if self.cells[x][y].is_mine:
-                    self.cells[x][y].button.config(text="💣", bg="red", relief=tk.SUNKEN)
-
-    def check_win(self):
-        for x in range(self.rows):
-            for y in range(self.cols):
-                cell = self.cells[x][y]
-                if not cell.is_mine and not cell.is_revealed:
-                    return False
-        return True
+        # Проходим только по минам, а не по всему полю
+        for x, y in self.board.mine_positions:
+            self.view.draw_mine(self.board.index(x, y))
 
     def show_ai_stats(self):
-        """Показывает статистику обучения ИИ"""
-        stats = self.ai.get_stats()
+        """Показывает статистику обучения ИИ; опыт читается в потоке ИИ, окно его не ждет"""
+        self.get_worker().request_stats()
+        self.master.after(AI_POLL_MS, self.poll_stats)
+
+    def poll_stats(self):
+        stats = self.worker.poll_stats()
+        if stats is None:
+            self.master.after(AI_POLL_MS, self.poll_stats)
+            return
         messagebox.showinfo("AI Statistics", stats)
 
+    def close(self):
+        """Закрывает окно, дождавшись, пока поток ИИ допишет опыт"""
+        self.save_record()
+        if self.pool_stop is not None:
+            self.pool_stop.set()
+        if self.worker:
+            self.worker.close()
+        self.master.destroy()
+
+
+def print_startup_report(stages):
+    """
+    Печатает время запуска окна по этапам [(название, момент perf_counter)]
+    и проверяет бюджет STARTUP_BUDGET_MS. Отсчет идет от начала импорта game.py,
+    запуск самого интерпретатора сюда не входит. Время импорта по модулям
+    показывает python -X importtime game.py --startup-report.
+    Возвращает True, если запуск уложился в бюджет.
+    """
+    previous = STARTED
+    for name, moment in stages:
+        print(f"{name}: {(moment - previous) * 1000:.1f} мс")
+        previous = moment
+    total = (previous - STARTED) * 1000
+    print(f"Всего до готовности окна: {total:.1f} мс (бюджет {STARTUP_BUDGET_MS} мс)")
+    loaded = [name for name in DEFERRED_MODULES if name in sys.modules]
+    print("Отложенные модули, загруженные при запуске: " + (', '.join(loaded) or "нет"))
+    if total > STARTUP_BUDGET_MS:
+        print("Запуск не уложился в бюджет")
+        return False
+    return True
+
 if __name__ == "__main__":
+    import argparse
+    from board import parse_size
+
+    parser = argparse.ArgumentParser(description="Сапер")
+    parser.add_argument('-s', '--size', type=parse_size, help="произвольное поле СТРОКИxСТОЛБЦЫxМИНЫ")
+    parser.add_argument('--view', choices=list(VIEWS), default='canvas',
+                        help="отрисовка поля: один холст или кнопка на каждую клетку")
+    parser.add_argument('--record', metavar='PATH', help="записывать партии в PATH для повтора через replay.py")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="замерить время до готовности окна, напечатать отчет и выйти "
+                             "(код 1, если превышен бюджет)")
+    args = parser.parse_args()
+
+    stages = [("импорт модулей", IMPORTED), ("разбор аргументов", time.perf_counter())]
     root = tk.Tk()
-    game = Minesweeper(root)
+    stages.append(("окно Tk", time.perf_counter()))
+    game = Minesweeper(root, args.view, args.size, args.record)
+    stages.append(("панель и поле", time.perf_counter()))
+    if args.startup_report:
+        # Обрабатываем все ожидающие события: окно показано и готово принимать клики
+        root.update()
+        stages.append(("первая отрисовка", time.perf_counter()))
+        within = print_startup_report(stages)
+        game.close()
+        sys.exit(0 if within else 1)
     root.mainloop()
\ No newline at end of file
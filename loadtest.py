@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from board import DIFFICULTIES
+from patterns import UNKNOWN
+from simulate import percentile
+
+
+class Client:
+    """Клиент сервера: шлет команды строками JSON и ждет ответы по номеру запроса"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.latencies = []
+
+    async def request(self, **command):
+        self.next_id += 1
+        command['id'] = self.next_id
+        start = time.perf_counter()
+        self.writer.write(json.dumps(command, separators=(',', ':')).encode() + b'\n')
+        while True:
+            response = json.loads(await self.reader.readline())
+            # События для зрителей приходят без номера запроса - пропускаем их
+            if response.get('id') == command['id']:
+                break
+        self.latencies.append(time.perf_counter() - start)
+        return response
+
+
+async def play(client, preset, rng, hint_rate):
+    """
+    Играет одну партию простым ботом: первый ход в центр, дальше с вероятностью hint_rate
+    ход по подсказке ИИ, иначе открытие случайной закрытой клетки.
+    Состояние поля бот знает только из присланных изменений.
+    Возвращает (исход, количество ходов).
+    """
+    game = await client.request(cmd='new', preset=preset, seed=rng.randrange(2 ** 32))
+    game_id, rows, cols = game['game'], game['rows'], game['cols']
+    cells = [UNKNOWN] * (rows * cols)
+    response = await client.request(cmd='reveal', game=game_id, x=rows // 2, y=cols // 2)
+    moves = 1
+    while response['state'] == 'playing':
+        for i, code in response['delta']:
+            cells[i] = code
+        move = None
+        if rng.random() < hint_rate:
+            hint = await client.request(cmd='hint', game=game_id)
+            if hint['ok'] and not hint['stale']:
+                move = (hint['action'], hint['x'], hint['y'])
+        if move is None:
+            i = rng.choice([i for i, code in enumerate(cells) if code == UNKNOWN])
+            move = ('reveal',) + divmod(i, cols)
+        action, x, y = move
+        response = await client.request(cmd=action, game=game_id, x=x, y=y)
+        moves += 1
+    await client.request(cmd='close', game=game_id)
+    return response['state'], moves
+
+
+async def run_client(host, port, unix, games, preset, seed, hint_rate, results):
+    if unix:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    client = Client(reader, writer)
+    rng = random.Random(seed)
+    try:
+        for _ in range(games):
+            results.append(await play(client, preset, rng, hint_rate))
+    finally:
+        writer.close()
+    return client.latencies
+
+
+async def load_test(args):
+    results = []
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(
+        run_client(args.host, args.port, args.unix, args.games, args.preset, args.seed + k, args.hint_rate, results)
+        for k in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    latencies = [t * 1000 for client in latencies for t in client]
+    moves = sum(m for state, m in results)
+    wins = sum(state == 'won' for state, m in results)
+    print(f"Клиентов: {args.clients}, партий: {len(results)} (побед {wins}), ходов: {moves}, "
+          f"запросов: {len(latencies)} за {elapsed:.2f} с ({len(latencies) / elapsed:.0f} запросов/с), "
+          f"задержка p50 {percentile(latencies, 0.5):.2f} мс, p95 {percentile(latencies, 0.95):.2f} мс, "
+          f"p99 {percentile(latencies, 0.99):.2f} мс, max {max(latencies, default=0):.2f} мс",
+          file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервера партий (server.py)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help="подключаться к Unix-сокету")
+    parser.add_argument('-c', '--clients', type=int, default=1000, help="одновременных клиентов (партий)")
+    parser.add_argument('-n', '--games', type=int, default=3, help="партий на клиента подряд")
+    parser.add_argument('-p', '--preset', choices=list(DIFFICULTIES), default="Сложный")
+    parser.add_argument('--hint-rate', type=float, default=0.05, help="доля ходов по подсказке ИИ")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    asyncio.run(load_test(args))
+
+
+if __name__ == "__main__":
+    main()
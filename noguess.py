@@ -0,0 +1,265 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from board import DIFFICULTIES, Board, parse_size
+from replay import decode_layout, encode_layout
+from solver import build_constraints, solve_constraints
+
+try:
+    import fcntl
+except ImportError:  # Windows: без блокировки, пул заполняет один процесс
+    fcntl = None
+
+# Каталог с заготовленными полями: по файлу JSON Lines на размер поля
+POOL_DIR = 'noguess_pool'
+# Сколько полей держать в пуле для каждой сложности
+POOL_TARGET = 20
+# До какого числа неизвестных клеток решатель учитывает общее количество мин
+GLOBAL_LIMIT = 12
+# Выше такой плотности мин поля без угадываний почти не встречаются - их не генерируем
+MAX_DENSITY = 0.25
+# Сколько расстановок пробовать, прежде чем сдаться
+MAX_ATTEMPTS = 1000
+
+
+def can_generate(rows, cols, mines):
+    """Можно ли за разумное время сгенерировать поле без угадываний такого размера"""
+    return mines <= MAX_DENSITY * (rows * cols - 9)
+
+
+def solve_by_logic(board, first_x, first_y):
+    """
+    Решает поле одной логикой, начиная с первого клика: решатель ограничений
+    плюс общее число мин, когда неизвестных клеток остается немного.
+    Состояние открытых клеток и флажков поля сбрасывается.
+    Возвращает None, если поле решается целиком, иначе список неизвестных клеток
+    границы, на которых решатель остановился.
+    """
+    board.reset()
+    revealed, flagged, adjacent = board.revealed, board.flagged, board.adjacent
+    neighbors = board.table.neighbors
+
+    changed = board.reveal_cell(first_x, first_y)
+    frontier = set()
+    while True:
+        frontier.update(i for i in changed if adjacent[i])
+        frontier = {i for i in frontier
+                    if any(not revealed[n] and not flagged[n] for n in neighbors[i])}
+        mines_left = board.mines - board.flagged_cells
+        unknown = board.size - board.revealed_safe - board.flagged_cells
+        if unknown == mines_left:
+            # Все безопасные клетки открыты
+            return None
+
+        constraints = build_constraints(board, frontier)
+        safe, mines = solve_constraints(constraints)
+        if not safe and not mines and unknown <= GLOBAL_LIMIT:
+            cells = frozenset(i for i in range(board.size) if not revealed[i] and not flagged[i])
+            constraints[cells] = mines_left
+            safe, mines = solve_constraints(constraints)
+        if not safe and not mines:
+            return sorted({n for i in frontier for n in neighbors[i]
+                           if not revealed[n] and not flagged[n]})
+
+        changed = []
+        for i in mines:
+            board.toggle_flag(*divmod(i, board.cols))
+        for i in safe:
+            changed += board.reveal_cell(*divmod(i, board.cols))
+
+
+def repair(board, stuck, rng):
+    """
+    Исправляет поле, на котором решатель застрял: переносит случайную мину с границы
+    в закрытую клетку, по возможности не соседствующую с уже открытыми.
+    Клетки первого клика при этом не затрагиваются - они всегда открыты.
+    Возвращает False, если переносить некуда.
+    """
+    frontier_mines = [i for i in stuck if board.mine[i]]
+    if not frontier_mines:
+        return False
+    near_revealed = board.table.count(board.revealed)
+    closed = [i for i in range(board.size) if not board.revealed[i] and not board.mine[i]]
+    interior = [i for i in closed if not near_revealed[i]]
+    if not interior:
+        # Внутри места нет - переносим мину в другую закрытую клетку у границы
+        interior = closed
+    if not interior:
+        return False
+    source = rng.choice(frontier_mines)
+    target = rng.choice(interior)
+    board.mine[source] = 0
+    board.mine[target] = 1
+    board.update_mines()
+    return True
+
+
+def generate_board(rows, cols, mines, seed=None, max_repairs=3, max_attempts=MAX_ATTEMPTS):
+    """
+    Генерирует поле, которое решается от первого клика без угадываний:
+    расставляет мины, решает поле логикой и, если решатель застрял, переносит мины
+    с границы и решает заново (не больше max_repairs раз). Если исправить не удалось,
+    начинает с новой расстановки, всего не больше max_attempts расстановок.
+    Возвращает словарь {'seed', 'first', 'layout'} (формат расстановки как в replay).
+    Бросает ValueError, если плотность мин слишком велика или попытки кончились.
+    """
+    if not can_generate(rows, cols, mines):
+        raise ValueError(f"поле {rows}x{cols} с {mines} минами слишком плотное для генерации без угадываний")
+    rng = random.Random(seed)
+    for attempt in range(max_attempts):
+        board = Board(rows, cols, mines, rng.randrange(2 ** 32))
+        first_x, first_y = rng.randrange(rows), rng.randrange(cols)
+        board.place_mines(first_x, first_y)
+        for repairs in range(max_repairs + 1):
+            stuck = solve_by_logic(board, first_x, first_y)
+            if stuck is None:
+                return {'seed': board.seed, 'first': [first_x, first_y], 'layout': encode_layout(board)}
+            if repairs == max_repairs or not repair(board, stuck, rng):
+                break
+    raise ValueError(f"не удалось сгенерировать поле {rows}x{cols}x{mines} без угадываний "
+                     f"за {max_attempts} попыток")
+
+
+def make_board(entry, rows, cols, mines):
+    """Создает поле по заготовке; первый клик (entry['first']) делает уже игра"""
+    board = Board(rows, cols, mines, entry['seed'])
+    board.set_layout(decode_layout(entry['layout']))
+    return board
+
+
+def pool_path(rows, cols, mines, directory=POOL_DIR):
+    return os.path.join(directory, f"{rows}x{cols}x{mines}.jsonl")
+
+
+def open_locked(path):
+    """Открывает файл пула на чтение и запись под исключительной блокировкой"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    f = os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), 'r+b')
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    return f
+
+
+def pool_size(rows, cols, mines, directory=POOL_DIR):
+    try:
+        with open(pool_path(rows, cols, mines, directory), 'rb') as f:
+            return sum(1 for line in f if line.strip())
+    except FileNotFoundError:
+        return 0
+
+
+def add_to_pool(rows, cols, mines, entry, directory=POOL_DIR):
+    with open_locked(pool_path(rows, cols, mines, directory)) as f:
+        f.seek(0, os.SEEK_END)
+        f.write(json.dumps(entry, separators=(',', ':')).encode('ascii') + b'\n')
+
+
+def take_from_pool(rows, cols, mines, directory=POOL_DIR):
+    """Забирает из пула последнее поле (файл укорачивается), или None, если пул пуст"""
+    path = pool_path(rows, cols, mines, directory)
+    if not os.path.exists(path):
+        return None
+    with open_locked(path) as f:
+        lines = f.read().splitlines(keepends=True)
+        while lines and not lines[-1].strip():
+            lines.pop()
+        if not lines:
+            return None
+        last = lines.pop()
+        f.truncate(sum(len(line) for line in lines))
+    try:
+        return json.loads(last)
+    except ValueError:
+        # Недописанная строка после сбоя
+        return None
+
+
+def generate_task(task):
+    """Задача для пула процессов; вместо поля, которое не удалось сгенерировать, возвращает None"""
+    rows, cols, mines, seed = task
+    try:
+        return rows, cols, mines, generate_board(rows, cols, mines, seed)
+    except ValueError as e:
+        print(f"Ошибка генерации поля: {e}", file=sys.stderr)
+        return rows, cols, mines, None
+
+
+def fill_pools(sizes, target=POOL_TARGET, workers=None, directory=POOL_DIR, seed=None, stop=None):
+    """
+    Дополняет пулы для полей sizes (список (строки, столбцы, мины)) до target полей,
+    генерируя их в нескольких процессах. Готовые поля дописываются в пул сразу.
+    Размеры, для которых поле без угадываний не сгенерировать (can_generate), пропускаются.
+    stop - threading.Event: когда он установлен, заполнение прерывается, а процессы завершаются.
+    Возвращает количество добавленных полей.
+    """
+    rng = random.Random(seed)
+    tasks = [(rows, cols, mines, rng.randrange(2 ** 63))
+             for rows, cols, mines in dict.fromkeys(sizes) if can_generate(rows, cols, mines)
+             for _ in range(target - pool_size(rows, cols, mines, directory))]
+    if not tasks:
+        return 0
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        results = map(generate_task, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap_unordered(generate_task, tasks)
+    added = 0
+    try:
+        for rows, cols, mines, entry in results:
+            if stop is not None and stop.is_set():
+                break
+            if entry is not None:
+                add_to_pool(rows, cols, mines, entry, directory)
+                added += 1
+    finally:
+        if pool is not None:
+            if stop is not None and stop.is_set():
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+    return added
+
+
+def fill_in_background(sizes, target=POOL_TARGET, workers=None, directory=POOL_DIR, stop=None):
+    """
+    Запускает fill_pools в фоновом потоке (процессы генерации не мешают окну игры).
+    Установленный stop (threading.Event) останавливает заполнение и процессы генерации.
+    """
+    thread = threading.Thread(target=fill_pools, args=(list(sizes), target, workers, directory, None, stop),
+                              name="noguess-pool", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Заполнение пула полей без угадываний")
+    parser.add_argument('-p', '--preset', action='append', choices=list(DIFFICULTIES),
+                        help="сложность из игры (по умолчанию все)")
+    parser.add_argument('-s', '--size', action='append', type=parse_size, default=[],
+                        help="произвольное поле СТРОКИxСТОЛБЦЫxМИНЫ")
+    parser.add_argument('-n', '--target', type=int, default=POOL_TARGET, help="сколько полей держать в пуле")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="число процессов")
+    parser.add_argument('-d', '--directory', default=POOL_DIR, help="каталог пула")
+    args = parser.parse_args(argv)
+
+    sizes = [DIFFICULTIES[name] for name in (args.preset or ([] if args.size else DIFFICULTIES))]
+    sizes += [size for name, size in args.size]
+    for rows, cols, mines in sizes:
+        if not can_generate(rows, cols, mines):
+            print(f"Поле {rows}x{cols}x{mines} слишком плотное для генерации без угадываний - пропускаем",
+                  file=sys.stderr)
+    start = time.perf_counter()
+    added = fill_pools(sizes, args.target, args.workers, args.directory)
+    print(f"Добавлено полей: {added} за {time.perf_counter() - start:.2f} с", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Смещения соседей в фиксированном порядке: по строкам, без центральной клетки
+OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+# Коды состояний соседей по 4 бита: 0-8 - открытое число, дальше служебные символы
+MINE = 9      # открытая мина
+FLAG = 10     # флажок
+UNKNOWN = 11  # неоткрытая клетка
+WALL = 12     # за краем поля
+
+# 8 симметрий квадрата (повороты и отражения) как преобразования смещений
+SYMMETRIES = (
+    lambda dx, dy: (dx, dy),
+    lambda dx, dy: (dy, -dx),
+    lambda dx, dy: (-dx, -dy),
+    lambda dx, dy: (-dy, dx),
+    lambda dx, dy: (dx, -dy),
+    lambda dx, dy: (-dx, dy),
+    lambda dx, dy: (dy, dx),
+    lambda dx, dy: (-dy, -dx),
+)
+
+# PERMUTATIONS[t][k] - какой сосед исходного паттерна попадает на место k после симметрии t
+PERMUTATIONS = tuple(
+    tuple(next(j for j, offset in enumerate(OFFSETS) if symmetry(*offset) == target) for target in OFFSETS)
+    for symmetry in SYMMETRIES
+)
+# INVERSE[t] - номер симметрии, обратной к t
+INVERSE = tuple(
+    next(u for u, back in enumerate(SYMMETRIES) if all(back(*symmetry(*o)) == o for o in OFFSETS))
+    for symmetry in SYMMETRIES
+)
+
+
+def pack(codes):
+    """Упаковывает 8 кодов соседей в 32-битное число"""
+    key = 0
+    for k, code in enumerate(codes):
+        key |= code << (4 * k)
+    return key
+
+
+def canonical_pattern(codes):
+    """
+    Приводит паттерн из 8 кодов соседей к каноническому виду:
+    из 8 симметричных вариантов выбирается наименьший упакованный ключ.
+    Возвращает (канонический ключ, номер симметрии, которая к нему приводит).
+    """
+    best_key = None
+    best = 0
+    for t, permutation in enumerate(PERMUTATIONS):
+        key = 0
+        for k, j in enumerate(permutation):
+            key |= codes[j] << (4 * k)
+        if best_key is None or key < best_key:
+            best_key = key
+            best = t
+    return best_key, best
+
+
+def to_canonical(t, dx, dy):
+    """Переводит смещение хода в систему координат канонического паттерна"""
+    return SYMMETRIES[t](dx, dy)
+
+
+def from_canonical(t, dx, dy):
+    """Переводит смещение хода из канонического паттерна обратно на поле"""
+    return SYMMETRIES[INVERSE[t]](dx, dy)
@@ -0,0 +1,140 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+
+class NullStage:
+    """Пустой этап: используется, когда профилирование выключено, и ничего не стоит"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = NullStage()
+
+
+class Stage:
+    """Замер одного этапа; вложенные этапы записываются путем вида 'ai.safe_move;ai.rules'"""
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.profiler.stack()
+        stack.append(self.name)
+        self.path = ';'.join(stack)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.profiler.stack().pop()
+        self.profiler.record(self.path, elapsed)
+        return False
+
+
+class Profiler:
+    """
+    Необязательные замеры времени по этапам и счетчики решений.
+    По умолчанию выключен: stage() возвращает пустой этап, count() ничего не делает.
+    Этапы можно вкладывать друг в друга, у каждого потока свой стек этапов.
+    Результаты выгружаются в JSON или в формат свернутых стеков для flame graph
+    (строка 'этап;вложенный этап время_в_мкс').
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        self.stages = {}    # путь этапа -> [вызовов, суммарное время, максимальное время]
+        self.counters = {}  # название -> количество
+
+    def stack(self):
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def stage(self, name):
+        """Контекстный менеджер для замера этапа name"""
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name)
+
+    def count(self, name, n=1):
+        """Увеличивает счетчик name (например, какой этап ИИ выбрал ход)"""
+        if self.enabled:
+            with self.lock:
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, path, elapsed, calls=1, longest=None):
+        with self.lock:
+            stats = self.stages.get(path)
+            if stats is None:
+                stats = self.stages[path] = [0, 0.0, 0.0]
+            stats[0] += calls
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed if longest is None else longest)
+
+    def snapshot(self):
+        """Сырые данные для передачи между процессами и последующего merge"""
+        with self.lock:
+            return {'stages': {path: list(stats) for path, stats in self.stages.items()},
+                    'counters': dict(self.counters)}
+
+    def merge(self, snapshot):
+        """Добавляет данные snapshot() другого профилировщика (например, из процесса симуляции)"""
+        for path, (calls, total, longest) in snapshot['stages'].items():
+            self.record(path, total, calls, longest)
+        with self.lock:
+            for name, n in snapshot['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self):
+        """Сводка: по каждому этапу число вызовов, суммарное, среднее и максимальное время в мс"""
+        snapshot = self.snapshot()
+        stages = {}
+        for path, (calls, total, longest) in sorted(snapshot['stages'].items()):
+            stages[path] = {
+                'calls': calls,
+                'total_ms': round(total * 1000, 3),
+                'mean_ms': round(total / calls * 1000, 4) if calls else 0.0,
+                'max_ms': round(longest * 1000, 3),
+            }
+        return {'stages': stages, 'counters': snapshot['counters']}
+
+    def collapsed_stacks(self):
+        """
+        Строки свернутых стеков для flamegraph.pl / speedscope.
+        Для каждого пути указывается собственное время этапа (без вложенных) в микросекундах.
+        """
+        stages = self.snapshot()['stages']
+        own = {path: stats[1] for path, stats in stages.items()}
+        for path, stats in stages.items():
+            parent = path.rpartition(';')[0]
+            if parent in own:
+                own[parent] -= stats[1]
+        return [f"{path} {max(0, round(total * 1e6))}" for path, total in sorted(own.items())]
+
+    def export(self, path):
+        """Сохраняет результаты: .folded или .txt - свернутые стеки, иначе JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if path.endswith(('.folded', '.txt')):
+                f.write('\n'.join(self.collapsed_stacks()) + '\n')
+            else:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+# Общий профилировщик. Включается переменной окружения MINESWEEPER_PROFILE=путь_к_файлу,
+# результаты записываются в этот файл при выходе из программы
+profiler = Profiler()
+PROFILE_PATH = os.environ.get('MINESWEEPER_PROFILE')
+if PROFILE_PATH:
+    profiler.enabled = True
+    atexit.register(profiler.export, PROFILE_PATH)
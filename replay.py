@@ -0,0 +1,202 @@
+import argparse
+import base64
+import json
+import sys
+import time
+from board import Board
+from profiling import profiler
+
+# Версия формата записи партии
+RECORD_VERSION = 1
+
+
+def encode_layout(board):
+    """Упаковывает расстановку мин в битовую маску (бит на клетку) в base64"""
+    bits = bytearray((board.size + 7) // 8)
+    for x, y in board.mine_positions:
+        i = x * board.cols + y
+        bits[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+
+def decode_layout(text):
+    """Распаковывает битовую маску encode_layout в список индексов клеток с минами"""
+    indices = []
+    for k, byte in enumerate(base64.b64decode(text)):
+        while byte:
+            low = byte & -byte
+            indices.append(k * 8 + low.bit_length() - 1)
+            byte ^= low
+    return indices
+
+
+class GameRecorder:
+    """
+    Запись партии: размер поля, зерно и расстановка мин, первый клик
+    и список ходов [время от начала в мс, действие, x, y].
+    Действия: 'c' - открыть клетку, 'f' - поставить или снять флажок, 'h' - аккорд (открыть соседей числа).
+    Записи хранятся по одной партии на строку JSON (JSON Lines).
+    """
+    def __init__(self, board):
+        self.board = board
+        self.start = time.perf_counter()
+        self.moves = []
+
+    def add(self, action, x, y):
+        self.moves.append([round((time.perf_counter() - self.start) * 1000, 3), action, x, y])
+
+    def to_dict(self):
+        board = self.board
+        first = next(([x, y] for t, action, x, y in self.moves if action == 'c'), None)
+        if board.game_over:
+            result = 'lost'
+        elif board.first_click or not board.check_win():
+            result = None
+        else:
+            result = 'won'
+        return {
+            'v': RECORD_VERSION,
+            'rows': board.rows,
+            'cols': board.cols,
+            'mines': board.mines,
+            'seed': board.seed,
+            'layout': None if board.first_click else encode_layout(board),
+            'first': first,
+            'moves': self.moves,
+            'result': result,
+        }
+
+    def save(self, path):
+        """Дописывает партию в файл записей"""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.to_dict(), separators=(',', ':')) + '\n')
+
+
+def read_records(path):
+    """Читает партии из файла записей"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def ai_move(ai, board):
+    """Ход, который ИИ сделал бы сейчас - в том же порядке, что и при игре: флажок, иначе клик"""
+    mine_move = ai.get_mine_move()
+    if mine_move and not board.is_flagged(*mine_move):
+        return 'f', mine_move
+    return 'c', ai.get_safe_move()
+
+
+def ai_moves(ai, board):
+    """
+    Ходы, которые ИИ сделал бы сейчас одним шагом, как в simulate.py и автоигре:
+    флажки на все найденные мины и открытие всех безопасных клеток,
+    а если таких нет - один клик по клетке, выбранной ИИ.
+    Возвращает (список ходов [(действие, x, y)], угадывание ли это).
+    """
+    safe, mines = ai.get_certain_moves()
+    moves = [('f', x, y) for x, y in mines if not board.is_flagged(x, y)]
+    if moves or safe:
+        # Ходы шага выбирает логика - считаем их, как get_mine_move и get_safe_move
+        if moves:
+            profiler.count('decision.rules_mine', len(moves))
+        if safe:
+            profiler.count('decision.rules', len(safe))
+        moves += [('c', x, y) for x, y in safe]
+        return moves, False
+    return [('c', *ai.get_safe_move())], True
+
+
+def replay(record, ai=None):
+    """
+    Повторяет записанную партию без интерфейса и без пауз между ходами.
+    Если передан ИИ, сравнивает записанные ходы с шагами ИИ (ai_moves)
+    и запоминает первый ход, на котором они разошлись.
+    Возвращает словарь с результатом повтора.
+    """
+    rows, cols = record['rows'], record['cols']
+    board = Board(rows, cols, record['mines'], record['seed'])
+    if record['layout'] is not None:
+        board.set_layout(decode_layout(record['layout']))
+    if ai is not None:
+        ai.rng.seed(record['seed'])
+        ai.set_field(board, rows, cols)
+
+    divergence = None
+    expected = []  # Оставшиеся ходы текущего шага ИИ
+    start = time.perf_counter()
+    for k, (t, action, x, y) in enumerate(record['moves']):
+        if ai is not None and k > 0 and divergence is None:
+            # Клики по клеткам, которые уже открыла заливка от прошлых ходов шага, не записываются
+            while expected and expected[0][0] == 'c' and board.is_revealed(*expected[0][1:]):
+                expected.pop(0)
+            if not expected:
+                expected = ai_moves(ai, board)[0]
+            predicted = expected.pop(0)
+            if predicted != (action, x, y):
+                divergence = {'move': k, 'recorded': [action, x, y], 'ai': list(predicted)}
+        changed = board.apply([(action, x, y)])[0]
+        if ai is not None:
+            ai.set_field(board, rows, cols, changed)
+    elapsed = time.perf_counter() - start
+
+    if board.game_over:
+        result = 'lost'
+    elif board.first_click or not board.check_win():
+        result = None
+    else:
+        result = 'won'
+    moves = record['moves']
+    return {
+        'seed': record['seed'],
+        'moves': len(moves),
+        'result': result,
+        'matches': result == record['result'],
+        'divergence': divergence,
+        'time': elapsed,
+        'recorded_time': moves[-1][0] / 1000 if moves else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Повтор записанных партий без интерфейса")
+    parser.add_argument('path', help="файл записей партий (JSON Lines)")
+    parser.add_argument('--ai', action='store_true',
+                        help="сверять записанные ходы с решениями ИИ и сообщать о первом расхождении")
+    parser.add_argument('--experience', metavar='PATH',
+                        help="журнал опыта ИИ для --ai (по умолчанию без опыта, как в simulate.py)")
+    args = parser.parse_args(argv)
+
+    ai = None
+    if args.ai:
+        from ai import AIHelper
+        ai = AIHelper(experience_path=args.experience)
+
+    games = moves = mismatches = diverged = 0
+    replay_time = recorded_time = 0.0
+    for record in read_records(args.path):
+        result = replay(record, ai)
+        games += 1
+        moves += result['moves']
+        replay_time += result['time']
+        recorded_time += result['recorded_time']
+        if not result['matches']:
+            mismatches += 1
+            print(f"Партия {games} (зерно {record['seed']}): записан исход {record['result']}, "
+                  f"при повторе {result['result']}", file=sys.stderr)
+        if result['divergence']:
+            diverged += 1
+            print(f"Партия {games} (зерно {record['seed']}): ИИ разошелся с записью "
+                  f"на ходе {result['divergence']}", file=sys.stderr)
+
+    speedup = recorded_time / replay_time if replay_time else 0.0
+    print(f"Партий: {games}, ходов: {moves}, повтор за {replay_time:.3f} с "
+          f"(запись шла {recorded_time:.3f} с, быстрее в {speedup:.1f} раз), "
+          f"несовпадений исхода: {mismatches}" + (f", расхождений ИИ: {diverged}" if ai else ""),
+          file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+import argparse
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import os
+import sys
+from board import DIFFICULTIES, Board
+from patterns import FLAG, MINE, UNKNOWN
+
+# Команды одиночных ходов и соответствующие им действия Board.apply
+MOVE_ACTIONS = {'reveal': 'c', 'flag': 'f', 'chord': 'h'}
+# Сколько секунд ждать подсказку ИИ, прежде чем признать процесс пула зависшим
+HINT_TIMEOUT = 5.0
+
+# ИИ процесса пула подсказок: создается один раз на процесс
+hint_ai = None
+
+
+def init_hint_worker(experience_path=None):
+    global hint_ai
+    from ai import AIHelper
+    # Опыт в процессах пула только читается; без experience_path ИИ подсказывает без опыта
+    hint_ai = AIHelper(experience_path=experience_path, learn=False)
+
+
+def hint_task(board):
+    """Ищет подсказку для копии поля в процессе пула: ('f' или 'c', (x, y))"""
+    from replay import ai_move
+    hint_ai.set_field(board, board.rows, board.cols)
+    action, move = ai_move(hint_ai, board)
+    return action, list(move)
+
+
+def cell_code(board, i):
+    """Код состояния клетки для клиента: 0-8 - открытое число, MINE, FLAG или UNKNOWN (как в patterns)"""
+    if board.revealed[i]:
+        return MINE if board.mine[i] else board.adjacent[i]
+    return FLAG if board.flagged[i] else UNKNOWN
+
+
+def game_state(board):
+    if board.game_over:
+        return 'lost'
+    if not board.first_click and board.check_win():
+        return 'won'
+    return 'playing'
+
+
+class Session:
+    """Одна партия на сервере: поле, его версия и подписанные на изменения зрители"""
+    def __init__(self, game_id, board):
+        self.id = game_id
+        self.board = board
+        self.version = 0
+        self.watchers = set()
+
+
+class GameServer:
+    """
+    Сервер на asyncio, который держит много партий без интерфейса.
+    Клиенты шлют команды строками JSON (по одной на строку) через TCP или Unix-сокет:
+    new, reveal, flag, chord, apply, hint, watch, close, stats. Команда apply делает
+    сразу несколько ходов [действие, x, y] (действия как в записи партии: 'c', 'f', 'h').
+    В ответ на ход приходит только изменение поля - список [индекс клетки, код состояния];
+    то же изменение рассылается зрителям партии. Подсказки ИИ считаются в пуле процессов,
+    чтобы не останавливать цикл событий; подсказка, не готовая за hint_timeout секунд,
+    отменяется вместе с пулом.
+    """
+    def __init__(self, workers=None, experience_path=None, hint_timeout=HINT_TIMEOUT):
+        self.sessions = {}
+        self.ids = itertools.count(1)
+        self.workers = workers
+        self.experience_path = experience_path
+        self.hint_timeout = hint_timeout
+        self.executor = None
+        self.moves = 0
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(self.workers, initializer=init_hint_worker,
+                                                                   initargs=(self.experience_path,))
+        return self.executor
+
+    def recycle_executor(self):
+        """Останавливает пул подсказок с зависшим процессом; следующая подсказка создаст новый пул"""
+        executor, self.executor = self.executor, None
+        if executor is None:
+            return
+        # Зависший процесс сам не освободится - завершаем процессы пула
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    async def handle_client(self, reader, writer):
+        owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = {}
+                try:
+                    request = json.loads(line)
+                    response = await self.dispatch(request, writer, owned)
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {'ok': False, 'error': str(e)}
+                if isinstance(request, dict) and 'id' in request:
+                    # Номер запроса возвращается, чтобы клиент мог слать команды не дожидаясь ответов
+                    response['id'] = request['id']
+                writer.write(json.dumps(response, separators=(',', ':')).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # Партии клиента закрываются вместе с соединением
+            for game_id in owned:
+                self.sessions.pop(game_id, None)
+            for session in self.sessions.values():
+                session.watchers.discard(writer)
+            writer.close()
+
+    async def dispatch(self, request, writer, owned):
+        command = request['cmd']
+        if command == 'new':
+            return self.new_game(request, owned)
+        if command == 'stats':
+            return {'ok': True, 'games': len(self.sessions), 'moves': self.moves}
+
+        session = self.sessions.get(request['game'])
+        if session is None:
+            return {'ok': False, 'error': f"нет партии {request['game']}"}
+        board = session.board
+        if command in MOVE_ACTIONS:
+            changed = board.apply([(MOVE_ACTIONS[command], request['x'], request['y'])])[0]
+        elif command == 'apply':
+            changed = board.apply([(action, x, y) for action, x, y in request['moves']])[0]
+        elif command == 'hint':
+            return await self.hint(session)
+        elif command == 'watch':
+            session.watchers.add(writer)
+            return self.full_state(session)
+        elif command == 'close':
+            self.sessions.pop(session.id, None)
+            owned.discard(session.id)
+            return {'ok': True, 'game': session.id}
+        else:
+            return {'ok': False, 'error': f"неизвестная команда {command}"}
+        return self.apply_delta(session, changed)
+
+    def new_game(self, request, owned):
+        if 'preset' in request:
+            rows, cols, mines = DIFFICULTIES[request['preset']]
+        else:
+            rows, cols, mines = request['rows'], request['cols'], request['mines']
+        if rows < 1 or cols < 1 or not 0 <= mines <= rows * cols - 9:
+            return {'ok': False, 'error': f"некорректный размер поля {rows}x{cols}x{mines}"}
+        game_id = next(self.ids)
+        self.sessions[game_id] = Session(game_id, Board(rows, cols, mines, request.get('seed')))
+        owned.add(game_id)
+        return {'ok': True, 'game': game_id, 'rows': rows, 'cols': cols, 'mines': mines}
+
+    def apply_delta(self, session, changed):
+        """Формирует ответ с изменением поля и рассылает его зрителям"""
+        board = session.board
+        session.version += 1
+        self.moves += 1
+        delta = [[i, cell_code(board, i)] for i in changed]
+        state = game_state(board)
+        if state == 'lost':
+            # При проигрыше показываем все мины
+            delta += [[x * board.cols + y, MINE] for x, y in board.mine_positions]
+        response = {'ok': True, 'game': session.id, 'version': session.version,
+                    'state': state, 'flags': board.flagged_cells, 'delta': delta}
+        if session.watchers:
+            event = json.dumps(dict(response, event='delta'), separators=(',', ':')).encode() + b'\n'
+            for watcher in list(session.watchers):
+                if watcher.is_closing():
+                    session.watchers.discard(watcher)
+                else:
+                    watcher.write(event)
+        return response
+
+    def full_state(self, session):
+        """Все поле целиком для нового зрителя"""
+        board = session.board
+        return {'ok': True, 'game': session.id, 'version': session.version, 'state': game_state(board),
+                'rows': board.rows, 'cols': board.cols, 'mines': board.mines, 'flags': board.flagged_cells,
+                'cells': [cell_code(board, i) for i in range(board.size)]}
+
+    async def hint(self, session):
+        board = session.board
+        if board.first_click or board.game_over:
+            return {'ok': False, 'error': "партия не началась или закончилась"}
+        version = session.version
+        loop = asyncio.get_running_loop()
+        try:
+            action, move = await asyncio.wait_for(
+                loop.run_in_executor(self.get_executor(), hint_task, board.copy()), self.hint_timeout)
+        except asyncio.TimeoutError:
+            self.recycle_executor()
+            return {'ok': False, 'error': f"ИИ не нашел подсказку за {self.hint_timeout} с"}
+        except concurrent.futures.process.BrokenProcessPool:
+            # Пул остановили из-за зависшей подсказки другой партии
+            return {'ok': False, 'error': "пул подсказок перезапущен, повторите запрос"}
+        # Если поле успело измениться, подсказка устарела - клиент видит это по версии
+        return {'ok': True, 'game': session.id, 'version': version, 'stale': version != session.version,
+                'action': 'flag' if action == 'f' else 'reveal', 'x': move[0], 'y': move[1]}
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+
+
+async def serve(host='127.0.0.1', port=8765, unix=None, workers=None, experience_path=None,
+                hint_timeout=HINT_TIMEOUT):
+    game_server = GameServer(workers, experience_path, hint_timeout)
+    if unix:
+        server = await asyncio.start_unix_server(game_server.handle_client, unix, backlog=4096)
+    else:
+        server = await asyncio.start_server(game_server.handle_client, host, port, backlog=4096)
+    where = unix or f"{host}:{port}"
+    print(f"Сервер Сапера слушает {where}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        game_server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер партий Сапера без интерфейса")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help="слушать Unix-сокет вместо TCP")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="процессов для подсказок ИИ")
+    parser.add_argument('--experience', metavar='PATH',
+                        help="журнал опыта ИИ для подсказок (только чтение; по умолчанию ИИ подсказывает без опыта)")
+    parser.add_argument('--hint-timeout', type=float, default=HINT_TIMEOUT,
+                        help="сколько секунд ждать подсказку ИИ")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers, args.experience, args.hint_timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
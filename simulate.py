@@ -0,0 +1,200 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from ai import AIHelper
+from board import DIFFICULTIES, Board, parse_size
+from profiling import Profiler, profiler
+from replay import GameRecorder, ai_moves
+
+# ИИ рабочего процесса: создается один раз, чтобы не загружать опыт на каждую партию
+worker_ai = None
+worker_learn = False
+worker_record = False
+
+
+def init_worker(learn=False, profile=False, record=False, experience_path=None):
+    global worker_ai, worker_learn, worker_record
+    if profile:
+        profiler.enabled = True
+    # Без experience_path ИИ играет без опыта: результаты зависят только от зерна
+    worker_ai = AIHelper(experience_path=experience_path, learn=learn)
+    worker_learn = learn
+    worker_record = record
+
+
+def play_game(ai, rows, cols, mines, seed, learn=False, record=False):
+    """
+    Играет одну партию ИИ без интерфейса: первый клик в центр поля,
+    дальше шагами, как автоигра в окне: за шаг применяются все ходы, которые следуют
+    из одного прохода решателя (флажки на мины и открытие безопасных клеток),
+    а если таких нет - один клик по клетке, выбранной ИИ (угадывание).
+    При learn=True ИИ запоминает ходы в журнал опыта.
+    Возвращает словарь с результатом партии (при record=True - вместе с записью партии);
+    move_times - время каждого шага.
+    """
+    ai.rng.seed(seed)
+    board = Board(rows, cols, mines, seed)
+    recorder = GameRecorder(board) if record else None
+    ai.set_field(board, rows, cols)
+
+    move_times = []
+    moves = 0
+    guesses = 0
+    start = time.perf_counter()
+    changed = board.click(rows // 2, cols // 2)
+    if recorder:
+        recorder.add('c', rows // 2, cols // 2)
+    ai.set_field(board, rows, cols, changed)
+
+    while not board.game_over and not board.check_win():
+        move_start = time.perf_counter()
+        batch, guessed = ai_moves(ai, board)
+        if guessed:
+            guesses += 1
+            action, x, y = batch[0]
+            if board.is_revealed(x, y) or board.is_flagged(x, y):
+                # ИИ не нашел ни одной закрытой клетки - дальше играть нечем
+                break
+        if learn:
+            # Паттерны ходов берутся с поля до их применения
+            for action, x, y in batch:
+                ai.learn_from_move(x, y, True)
+        changed, applied = board.apply(batch)
+        if recorder:
+            for move in applied:
+                recorder.add(*move)
+        if learn and board.game_over:
+            ai.learn_from_move(*applied[-1][1:], False)
+        moves += len(applied)
+        ai.set_field(board, rows, cols, changed)
+        move_times.append(time.perf_counter() - move_start)
+
+    if learn:
+        ai.save_experience()
+
+    result = {
+        'rows': rows,
+        'cols': cols,
+        'mines': mines,
+        'seed': seed,
+        'won': not board.game_over and board.check_win(),
+        'moves': moves,
+        'guesses': guesses,
+        'time': round(time.perf_counter() - start, 6),
+        'move_times': [round(t * 1000, 3) for t in move_times],  # миллисекунды
+    }
+    if recorder:
+        result['record'] = recorder.to_dict()
+    return result
+
+
+def run_game(task):
+    """Задача для пула процессов: (название, строки, столбцы, мины, зерно)"""
+    name, rows, cols, mines, seed = task
+    result = play_game(worker_ai, rows, cols, mines, seed, worker_learn, worker_record)
+    result['preset'] = name
+    if profiler.enabled:
+        # Замеры партии уходят в главный процесс вместе с результатом
+        result['profile'] = profiler.snapshot()
+        profiler.reset()
+    return result
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def print_summary(results, out):
+    """Печатает сводку по каждой сложности"""
+    by_preset = {}
+    for result in results:
+        by_preset.setdefault(result['preset'], []).append(result)
+    for name, games in by_preset.items():
+        wins = sum(g['won'] for g in games)
+        move_times = [t for g in games for t in g['move_times']]
+        print(f"{name}: партий {len(games)}, побед {wins} ({wins / len(games) * 100:.1f}%), "
+              f"ходов в среднем {sum(g['moves'] for g in games) / len(games):.1f}, "
+              f"угадываний {sum(g['guesses'] for g in games) / len(games):.2f}, "
+              f"время шага p50 {percentile(move_times, 0.5):.3f} мс, "
+              f"p95 {percentile(move_times, 0.95):.3f} мс, "
+              f"max {max(move_times, default=0):.3f} мс", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная симуляция партий ИИ без интерфейса")
+    parser.add_argument('-n', '--games', type=int, default=100, help="партий на каждую сложность")
+    parser.add_argument('-p', '--preset', action='append', choices=list(DIFFICULTIES),
+                        help="сложность из игры (по умолчанию все)")
+    parser.add_argument('-s', '--size', action='append', type=parse_size, default=[],
+                        help="произвольное поле СТРОКИxСТОЛБЦЫxМИНЫ")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help="число процессов")
+    parser.add_argument('--seed', type=int, default=0, help="базовое зерно, партия i играет с зерном seed + i")
+    parser.add_argument('--experience', metavar='PATH',
+                        help="журнал опыта ИИ (по умолчанию ИИ играет без опыта, "
+                             "и результаты зависят только от зерна)")
+    parser.add_argument('--learn', action='store_true',
+                        help="записывать ходы ИИ в журнал --experience (безопасно для нескольких процессов)")
+    parser.add_argument('--profile', metavar='PATH',
+                        help="замерить этапы ИИ и движка и сохранить в PATH (.folded - для flame graph, иначе JSON)")
+    parser.add_argument('--record', metavar='PATH',
+                        help="дописывать записи партий в PATH для повтора через replay.py")
+    parser.add_argument('-o', '--output', help="файл для результатов в формате JSON Lines (по умолчанию stdout)")
+    args = parser.parse_args(argv)
+    if args.learn and not args.experience:
+        parser.error("--learn требует --experience PATH")
+
+    boards = [(name, DIFFICULTIES[name]) for name in (args.preset or ([] if args.size else DIFFICULTIES))]
+    boards += args.size
+    tasks = [(name, rows, cols, mines, args.seed + i)
+             for name, (rows, cols, mines) in boards
+             for i in range(args.games)]
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    records = open(args.record, 'a', encoding='utf-8') if args.record else None
+    results = []
+    total_profile = Profiler()
+    start = time.perf_counter()
+    try:
+        if args.workers <= 1:
+            init_worker(args.learn, bool(args.profile), bool(args.record), args.experience)
+            stream = map(run_game, tasks)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(args.workers, initializer=init_worker,
+                                        initargs=(args.learn, bool(args.profile), bool(args.record),
+                                                  args.experience))
+            stream = pool.imap_unordered(run_game, tasks, chunksize=max(1, len(tasks) // (args.workers * 8)))
+        # Результаты пишутся по мере готовности партий
+        for result in stream:
+            if 'profile' in result:
+                total_profile.merge(result.pop('profile'))
+            if 'record' in result:
+                records.write(json.dumps(result.pop('record'), separators=(',', ':')) + '\n')
+            results.append(result)
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            out.flush()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if records is not None:
+            records.close()
+
+    print_summary(results, sys.stderr)
+    if args.profile:
+        total_profile.export(args.profile)
+        counters = total_profile.to_dict()['counters']
+        print("Решения ИИ: " + ", ".join(f"{name} {n}" for name, n in sorted(counters.items())), file=sys.stderr)
+    print(f"Всего партий: {len(results)} за {time.perf_counter() - start:.2f} с", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
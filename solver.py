@@ -0,0 +1,450 @@
+import math
+import random
+import time
+from collections import defaultdict
+
+# Перебор рекурсивен по клеткам компоненты: более длинные компоненты сразу уходят
+# в оценку выборкой, чтобы не упереться в предел глубины рекурсии
+MAX_EXACT_CELLS = 400
+
+
+def build_constraints(field, numbers):
+    """
+    Строит линейные ограничения по открытым числам на границе.
+    Каждое ограничение - пара (frozenset неизвестных клеток, количество мин в них):
+    число клетки минус соседние флажки равно сумме мин в ее неизвестных соседях.
+    Числа обходятся по возрастанию, чтобы порядок ограничений (и решения, которые от него
+    зависят) не менялся от истории множества numbers.
+    """
+    constraints = {}
+    neighbors = field.table.neighbors
+    for i in sorted(numbers):
+        cells = []
+        count = field.adjacent[i]
+        for n in neighbors[i]:
+            if field.flagged[n]:
+                count -= 1
+            elif not field.revealed[n]:
+                cells.append(n)
+        if cells and 0 <= count <= len(cells):
+            # Ограничения, противоречивые из-за ошибочных флажков, отбрасываются
+            constraints[frozenset(cells)] = count
+    return constraints
+
+
+def solve_constraints(constraints):
+    """
+    Детерминированно решает систему ограничений.
+    Повторяет до неподвижной точки:
+    - подстановку уже известных клеток;
+    - тривиальные правила (0 мин - все безопасны, мин столько же, сколько клеток - все мины);
+    - сведение подмножеств: если A входит в B, то B - A содержит mines(B) - mines(A) мин;
+    - попарное правило для пересекающихся A и B: если mines(A) - mines(B) равно |A - B|,
+      то A - B целиком мины, а B - A целиком безопасны.
+    Возвращает два множества индексов: безопасные клетки и мины.
+    """
+    safe = set()
+    mines = set()
+    current = dict(constraints)
+    # Противоречивые ограничения (из-за ошибочных флажков): не выводим их заново,
+    # иначе цикл никогда не дойдет до неподвижной точки
+    rejected = set()
+
+    while True:
+        found = False
+
+        # Подставляем известные клетки и применяем тривиальные правила
+        simplified = {}
+        for cells, count in current.items():
+            if safe or mines:
+                count -= len(cells & mines)
+                cells = cells - safe - mines
+            if not cells or count < 0 or count > len(cells):
+                # Пустое или противоречивое (например, из-за ошибочного флажка) ограничение
+                rejected.add(cells)
+                continue
+            if count == 0:
+                safe |= cells
+                found = True
+            elif count == len(cells):
+                mines |= cells
+                found = True
+            else:
+                simplified[cells] = count
+        current = simplified
+        if found:
+            continue
+
+        # Попарные правила для ограничений с общими клетками
+        by_cell = defaultdict(list)
+        for cells in current:
+            for c in cells:
+                by_cell[c].append(cells)
+
+        derived = {}
+        for a, count_a in current.items():
+            partners = set()
+            for c in a:
+                partners.update(by_cell[c])
+            partners.discard(a)
+            for b in partners:
+                count_b = current[b]
+                if a < b:
+                    rest = b - a
+                    if rest in current or rest in derived or rest in rejected:
+                        continue
+                    count = count_b - count_a
+                    if 0 <= count <= len(rest):
+                        derived[rest] = count
+                    else:
+                        rejected.add(rest)
+                elif not b < a:
+                    a_only = a - b
+                    if count_a - count_b == len(a_only):
+                        mines |= a_only
+                        safe |= b - a
+                        found = True
+
+        if derived:
+            current.update(derived)
+            found = True
+        if not found:
+            return safe, mines
+
+
+class BudgetExceeded(Exception):
+    """Точный перебор компоненты не уложился в бюджет"""
+
+
+def split_components(constraints):
+    """
+    Разбивает ограничения на независимые компоненты:
+    две клетки в одной компоненте, если их связывает цепочка общих ограничений.
+    Возвращает список пар (клетки в порядке обхода, список ограничений).
+    """
+    by_cell = defaultdict(list)
+    for cells in constraints:
+        for c in cells:
+            by_cell[c].append(cells)
+
+    components = []
+    visited = set()
+    for start in sorted(by_cell):
+        if start in visited:
+            continue
+        # Обход в ширину дает порядок, при котором ограничения закрываются быстро
+        order = [start]
+        visited.add(start)
+        seen_constraints = set()
+        k = 0
+        while k < len(order):
+            for cells in by_cell[order[k]]:
+                if cells in seen_constraints:
+                    continue
+                seen_constraints.add(cells)
+                for c in sorted(cells):
+                    if c not in visited:
+                        visited.add(c)
+                        order.append(c)
+            k += 1
+        components.append((order, [(cells, constraints[cells]) for cells in seen_constraints]))
+    return components
+
+
+def index_component(cells, constraints):
+    """
+    Готовит компоненту к перебору: нумерует клетки по порядку обхода и для каждой позиции
+    запоминает ограничения, в которые она входит, и сколько клеток этих ограничений
+    остается неназначенными после нее.
+    Возвращает (позиции клеток каждого ограничения, исходные остатки мин, touching, rest).
+    """
+    n = len(cells)
+    position = {c: p for p, c in enumerate(cells)}
+    constraint_positions = [sorted(position[c] for c in cs) for cs, count in constraints]
+    start_need = tuple(count for cs, count in constraints)
+    touching = [[] for _ in range(n)]
+    for j, positions in enumerate(constraint_positions):
+        for p in positions:
+            touching[p].append(j)
+    rest = [[sum(1 for q in constraint_positions[j] if q > p) for j in touching[p]]
+            for p in range(n)]
+    return constraint_positions, start_need, touching, rest
+
+
+def enumerate_component(cells, constraints, max_nodes, deadline):
+    """
+    Перебирает все расстановки мин в компоненте с отсечениями и мемоизацией.
+    Состояние перебора - позиция клетки и остаток мин для каждого ограничения,
+    одинаковые состояния считаются один раз. Компоненты длиннее MAX_EXACT_CELLS клеток
+    не перебираются (BudgetExceeded).
+    Возвращает словарь: число мин k -> (число решений, список числа решений с миной для каждой клетки).
+    """
+    n = len(cells)
+    if n > MAX_EXACT_CELLS:
+        raise BudgetExceeded()
+    constraint_positions, start_need, touching, rest = index_component(cells, constraints)
+
+    memo = {}
+    nodes = [0]
+
+    def solve(p, need):
+        if p == n:
+            return {0: (1, [])}
+        key = (p, need)
+        if key in memo:
+            return memo[key]
+        nodes[0] += 1
+        if nodes[0] > max_nodes or (nodes[0] & 1023 == 0 and time.perf_counter() > deadline):
+            raise BudgetExceeded()
+
+        result = {}
+        for v in (0, 1):
+            next_need = list(need)
+            for j, r in zip(touching[p], rest[p]):
+                left = next_need[j] - v
+                if left < 0 or left > r:
+                    break
+                next_need[j] = left
+            else:
+                for k, (ways, counts) in solve(p + 1, tuple(next_need)).items():
+                    head = ways if v else 0
+                    entry = result.get(k + v)
+                    if entry is None:
+                        result[k + v] = (ways, [head] + counts)
+                    else:
+                        result[k + v] = (entry[0] + ways,
+                                         [a + b for a, b in zip(entry[1], [head] + counts)])
+        memo[key] = result
+        return result
+
+    return solve(0, start_need)
+
+
+def sample_component(cells, constraints, rng, samples, deadline, batches=10):
+    """
+    Оценивает компоненту, слишком большую для точного перебора, выборкой решений.
+    Каждая выборка строится последовательно по клеткам: значение выбирается случайно
+    среди допустимых по остаткам ограничений, тупиковые цепочки отбрасываются.
+    Такая выборка неравномерна, поэтому каждое решение получает вес важности
+    2^(число клеток, где было два допустимых значения) - взвешенные частоты
+    сходятся к равномерному распределению по решениям компоненты.
+    Останавливается по числу выборок samples или по времени deadline.
+    Возвращает список распределений по пакетам выборок в формате enumerate_component
+    (вместо числа решений - суммарный вес); пакеты нужны для доверительных интервалов.
+    """
+    n = len(cells)
+    constraint_positions, start_need, touching, rest = index_component(cells, constraints)
+    per_batch = max(1, samples // batches)
+
+    drawn = []  # (номер пакета, число свободных выборов, расстановка)
+    draws = 0
+    while draws < samples and time.perf_counter() < deadline:
+        need = list(start_need)
+        state = bytearray(n)
+        choices = 0
+        for p in range(n):
+            can_empty = all(need[j] <= r for j, r in zip(touching[p], rest[p]))
+            can_mine = all(0 < need[j] <= r + 1 for j, r in zip(touching[p], rest[p]))
+            if can_empty and can_mine:
+                choices += 1
+                v = rng.random() < 0.5
+            elif can_empty or can_mine:
+                v = can_mine
+            else:
+                break
+            if v:
+                state[p] = 1
+                for j in touching[p]:
+                    need[j] -= 1
+        else:
+            drawn.append((draws // per_batch, choices, state))
+        draws += 1
+    if not drawn:
+        raise BudgetExceeded()
+
+    # Веса нормируем на максимальный, чтобы не переполнить float
+    top = max(choices for _, choices, _ in drawn)
+    result = [{} for _ in range(drawn[-1][0] + 1)]
+    for b, choices, state in drawn:
+        w = 2.0 ** (choices - top)
+        k = sum(state)
+        entry = result[b].get(k)
+        if entry is None:
+            result[b][k] = (w, [w * v for v in state])
+        else:
+            result[b][k] = (entry[0] + w, [a + w * v for a, v in zip(entry[1], state)])
+    return [batch for batch in result if batch]
+
+
+def merge_batches(batches):
+    """Складывает распределения пакетов выборок в одно"""
+    merged = {}
+    for batch in batches:
+        for k, (ways, counts) in batch.items():
+            entry = merged.get(k)
+            if entry is None:
+                merged[k] = (ways, list(counts))
+            else:
+                merged[k] = (entry[0] + ways, [a + b for a, b in zip(entry[1], counts)])
+    return merged
+
+
+def local_estimate(cells, constraints):
+    """
+    Приближенная вероятность мины для клеток компоненты, которую не удалось перебрать:
+    среднее отношение "мины ограничения / клетки ограничения" по ограничениям клетки.
+    """
+    total = defaultdict(float)
+    seen = defaultdict(int)
+    for cs, count in constraints:
+        for c in cs:
+            total[c] += count / len(cs)
+            seen[c] += 1
+    return {c: total[c] / seen[c] for c in cells}
+
+
+def log_comb(n, k):
+    """Логарифм биномиального коэффициента C(n, k)"""
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+def convolve(a, b):
+    """Свертка распределений числа мин: словари k -> вес"""
+    result = defaultdict(float)
+    for ka, wa in a.items():
+        for kb, wb in b.items():
+            result[ka + kb] += wa * wb
+    return result
+
+
+def mine_probabilities(constraints, unknown_count, mines_left, max_nodes=200000, time_limit=0.04,
+                       samples=0, sample_time=0.05, rng=None):
+    """
+    Точные вероятности мин для клеток границы.
+    Граница разбивается на независимые компоненты, каждая перебирается отдельно,
+    а результаты объединяются с учетом общего числа оставшихся мин:
+    конфигурация границы с K минами весит C(внутренние клетки, mines_left - K).
+    Компоненты, не уложившиеся в бюджет (max_nodes состояний или time_limit секунд),
+    оцениваются выборкой решений, если samples > 0 (не более samples выборок на компоненту
+    и sample_time секунд на все такие компоненты, генератор rng), иначе - приближенно
+    по локальной плотности без учета общего числа мин.
+    Возвращает (словарь индекс -> вероятность, вероятность для внутренних клеток или None,
+    признак того, что все компоненты посчитаны точно,
+    словарь индекс -> 95% доверительный интервал для клеток, оцененных выборкой).
+    """
+    deadline = time.perf_counter() + time_limit
+    rng = rng or random.Random()
+    sample_deadline = None
+    probabilities = {}
+    bounds = {}
+    exact = True
+    interior = unknown_count
+    mines = mines_left
+
+    distributions = []  # для каждой компоненты: клетки, k -> вес, k -> веса клеток, пакеты выборок
+    for cells, component_constraints in split_components(constraints):
+        interior -= len(cells)
+        batches = None
+        try:
+            solutions = enumerate_component(cells, component_constraints, max_nodes, deadline)
+        except BudgetExceeded:
+            exact = False
+            solutions = None
+            if samples > 0:
+                if sample_deadline is None:
+                    sample_deadline = time.perf_counter() + sample_time
+                try:
+                    batches = sample_component(cells, component_constraints, rng, samples, sample_deadline)
+                    solutions = merge_batches(batches)
+                except BudgetExceeded:
+                    pass
+        if not solutions:
+            # Перебор не уложился в бюджет или у компоненты нет ни одной согласованной
+            # расстановки (ошибочные флажки) - оцениваем по локальной плотности
+            exact = False
+            estimate = local_estimate(cells, component_constraints)
+            probabilities.update(estimate)
+            mines -= round(sum(estimate.values()))
+            continue
+        # Масштабируем веса компоненты, чтобы произведение по компонентам не переполнялось
+        scale = max(ways for ways, counts in solutions.values())
+        distributions.append((
+            cells,
+            {k: ways / scale for k, (ways, counts) in solutions.items()},
+            {k: [c / scale for c in counts] for k, (ways, counts) in solutions.items()},
+            batches,
+        ))
+
+    # Вес внутренних клеток для K мин на границе, нормированный на максимум
+    max_k = sum(max(d) for _, d, _, _ in distributions)
+    log_weights = {k: log_comb(interior, mines - k) for k in range(max_k + 1) if 0 <= mines - k <= interior}
+    if not log_weights:
+        # Противоречие с общим числом мин (например, лишние флажки) - оставляем только локальные веса
+        log_weights = {k: 0.0 for k in range(max_k + 1)}
+        exact = False
+    top = max(log_weights.values())
+    weight = {k: math.exp(w - top) for k, w in log_weights.items()}
+
+    # Распределения "все компоненты, кроме j" через префиксные и суффиксные свертки
+    count = len(distributions)
+    prefix = [{0: 1.0}]
+    for _, dist, _, _ in distributions:
+        prefix.append(convolve(prefix[-1], dist))
+    suffix = [{0: 1.0}]
+    for _, dist, _, _ in reversed(distributions):
+        suffix.append(convolve(suffix[-1], dist))
+    suffix.reverse()
+
+    total = sum(w * weight.get(k, 0.0) for k, w in prefix[-1].items())
+    if total == 0:
+        return probabilities, None, False, bounds
+
+    for j, (cells, dist, cell_counts, batches) in enumerate(distributions):
+        others = convolve(prefix[j], suffix[j + 1]) if count > 1 else {0: 1.0}
+        # Вес конфигурации компоненты с k минами с учетом остальных компонент и внутренних клеток
+        g = {k: sum(w * weight.get(k + other, 0.0) for other, w in others.items()) for k in dist}
+        mine_weight = [0.0] * len(cells)
+        for k, counts in cell_counts.items():
+            if g[k]:
+                for p, c in enumerate(counts):
+                    mine_weight[p] += c * g[k]
+        for p, c in enumerate(cells):
+            probabilities[c] = mine_weight[p] / total
+        if batches:
+            bounds.update(batch_bounds(cells, batches, g))
+
+    interior_probability = None
+    if interior > 0:
+        expected = sum(w * weight.get(k, 0.0) * (mines - k) for k, w in prefix[-1].items())
+        interior_probability = expected / total / interior
+    return probabilities, interior_probability, exact, bounds
+
+
+def batch_bounds(cells, batches, g):
+    """
+    95% доверительные интервалы по методу средних по пакетам:
+    каждый пакет выборок дает свою оценку вероятности, разброс оценок задает интервал.
+    g - вес конфигурации компоненты с k минами.
+    """
+    estimates = []
+    for batch in batches:
+        total = sum(ways * g.get(k, 0.0) for k, (ways, counts) in batch.items())
+        if not total:
+            continue
+        mine_weight = [0.0] * len(cells)
+        for k, (ways, counts) in batch.items():
+            for p, c in enumerate(counts):
+                mine_weight[p] += c * g.get(k, 0.0)
+        estimates.append([w / total for w in mine_weight])
+
+    bounds = {}
+    m = len(estimates)
+    for p, c in enumerate(cells):
+        values = [e[p] for e in estimates]
+        mean = sum(values) / m if m else 0.0
+        if m > 1:
+            spread = 1.96 * math.sqrt(sum((v - mean) ** 2 for v in values) / (m - 1) / m)
+        else:
+            spread = 1.0
+        bounds[c] = (max(0.0, mean - spread), min(1.0, mean + spread))
+    return bounds
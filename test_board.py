@@ -0,0 +1,17 @@
+from board import Board
+
+
+def test_flag_before_first_click_counts_as_correct():
+    board = Board(9, 9, 10, 6)
+    board.toggle_flag(0, 0)
+    board.click(8, 8)
+    assert board.correct_flags == (1 if board.is_mine(0, 0) else 0)
+    board.toggle_flag(0, 0)
+    assert board.correct_flags == 0
+
+
+def test_mine_positions_match_layout():
+    board = Board(16, 30, 99, 1)
+    board.click(8, 15)
+    assert board.mine_positions == [divmod(i, board.cols) for i in range(board.size) if board.mine[i]]
+    assert len(board.mine_positions) == board.mines
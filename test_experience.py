@@ -0,0 +1,30 @@
+import experience
+from experience import ExperienceStore, ExperienceTable
+
+
+def test_new_moves_are_reindexed_after_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(experience, 'REINDEX_RECORDS', 100)
+    store = ExperienceStore(str(tmp_path / 'ai_experience.log'), legacy_path=None, flush_every=50)
+    table = ExperienceTable(store)
+    for i in range(1000):
+        table.add(i % 300, 0, 0)
+        store.add_move(i % 300, 0, 0)
+        if store.flush_due():
+            store.flush()
+            table.flushed()
+        assert table.tail_records <= 150
+    store.flush()
+    table.flushed()
+    fresh = ExperienceTable(store)
+    for key in range(300):
+        expected = {(0, 0): 4 if key < 100 else 3}
+        assert table.get(key) == expected and fresh.get(key) == expected
+
+
+def test_legacy_file_is_taken_next_to_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'ai_experience.json').write_text('{"experience": {}, "success_count": 5, "failure_count": 2}')
+    other = tmp_path / 'other'
+    other.mkdir()
+    assert ExperienceTable(ExperienceStore(str(other / 'new.log'))).counts() == (0, 0)
+    assert ExperienceTable(ExperienceStore('ai_experience.log')).counts() == (5, 2)
@@ -0,0 +1,31 @@
+from ai import AIHelper
+from board import Board
+from solver import solve_constraints
+
+
+def test_contradictory_subset_does_not_loop():
+    # B - A получает -1 мину: такое ограничение отбрасывается и больше не выводится
+    safe, mines = solve_constraints({frozenset({1, 2, 3}): 2, frozenset({1, 2, 3, 4, 5}): 1})
+    assert safe == set() and mines == set()
+
+
+def test_wrong_flags_do_not_hang_mine_move():
+    board = Board(16, 16, 40, 3022)
+    board.apply([('c', 8, 8), ('c', 1, 5), ('c', 15, 1), ('c', 1, 11), ('c', 9, 3),
+                 ('c', 6, 12), ('c', 3, 11), ('c', 5, 11), ('f', 12, 0), ('f', 3, 9)])
+    ai = AIHelper(experience_path=None)
+    ai.set_field(board, board.rows, board.cols)
+    move = ai.get_mine_move()
+    assert move is None or not board.is_revealed(*move)
+
+
+def test_wrong_flags_do_not_break_probabilities():
+    board = Board(9, 9, 10, 975)
+    board.apply([('c', 4, 4), ('c', 7, 8), ('c', 8, 7), ('c', 8, 6), ('c', 8, 8),
+                 ('c', 8, 0), ('c', 8, 3), ('c', 8, 1), ('f', 8, 5), ('f', 8, 2)])
+    ai = AIHelper(experience_path=None)
+    ai.set_field(board, board.rows, board.cols)
+    # Все закрытые клетки без флажков здесь - мины: вероятности считаются приближенно
+    probabilities, interior, exact, bounds = ai.get_probabilities()
+    assert not exact and all(0 <= p <= 1 for p in probabilities.values())
+    ai.get_safe_move()
@@ -0,0 +1,187 @@
+import tkinter as tk
+
+# Размер клетки на холсте в пикселях: обычный, минимальный и предельный размер всего поля
+CELL_SIZE = 32
+MIN_CELL_SIZE = 8
+MAX_BOARD_SIZE = 900
+
+
+def cell_look(board, i):
+    """Возвращает (текст, цвет фона, открыта ли) для отрисовки клетки i по состоянию движка"""
+    if board.revealed[i]:
+        if board.mine[i]:
+            return "💣", "red", True
+        if board.adjacent[i] > 0:
+            return str(board.adjacent[i]), "white", True
+        return "", "white", True
+    return ("🚩" if board.flagged[i] else ""), "lightgray", False
+
+
+class ButtonView:
+    """Игровое поле из отдельной кнопки tk.Button на каждую клетку"""
+    def __init__(self, parent, on_click, on_flag, on_chord):
+        self.parent = parent
+        self.on_click = on_click
+        self.on_flag = on_flag
+        self.on_chord = on_chord
+        self.buttons = []
+
+    def build(self, rows, cols):
+        """Создает кнопки заново под поле rows x cols"""
+        self.destroy()
+        for x in range(rows):
+            for y in range(cols):
+                button = tk.Button(
+                    self.parent,
+                    width=3,
+                    height=2,
+                    font=('Arial', 12, 'bold'),
+                    bg='lightgray',
+                    relief=tk.RAISED,
+                    command=lambda x=x, y=y: self.on_click(x, y)
+                )
+                button.bind('<Button-3>', lambda e, x=x, y=y: self.on_flag(x, y))
+                # Аккорд - средней кнопкой или двойным щелчком по числу
+                button.bind('<Button-2>', lambda e, x=x, y=y: self.on_chord(x, y))
+                button.bind('<Double-Button-1>', lambda e, x=x, y=y: self.on_chord(x, y))
+                button.grid(row=x, column=y, padx=1, pady=1)
+                self.buttons.append(button)
+
+    def draw_cell(self, board, i):
+        text, bg, opened = cell_look(board, i)
+        if opened:
+            self.buttons[i].config(text=text, bg=bg, relief=tk.SUNKEN)
+        else:
+            self.buttons[i].config(text=text, bg=bg)
+
+    def draw_mine(self, i):
+        self.buttons[i].config(text="💣", bg="red", relief=tk.SUNKEN)
+
+    def draw_cells(self, board, changed):
+        for i in changed:
+            self.draw_cell(board, i)
+
+    def destroy(self):
+        for button in self.buttons:
+            button.destroy()
+        self.buttons = []
+
+
+class CanvasView:
+    """
+    Игровое поле на одном tk.Canvas. Закрытое поле - один светлый прямоугольник
+    под сеткой линий, поэтому подготовка поля стоит O(строк + столбцов), а не O(клеток),
+    и окно появляется сразу при любом размере поля.
+    Прямоугольник и текст клетки создаются при первой ее перерисовке не в начальном виде
+    и хранятся в items; перезапуск удаляет только их.
+    Поле больше MAX_BOARD_SIZE пикселей прокручивается полосами прокрутки.
+    """
+    def __init__(self, parent, on_click, on_flag, on_chord):
+        self.on_click = on_click
+        self.on_flag = on_flag
+        self.on_chord = on_chord
+        self.frame = tk.Frame(parent)
+        self.frame.pack()
+        self.canvas = tk.Canvas(self.frame, bg='gray', highlightthickness=0)
+        self.canvas.grid(row=0, column=0)
+        self.xscroll = tk.Scrollbar(self.frame, orient=tk.HORIZONTAL, command=self.canvas.xview)
+        self.yscroll = tk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.config(xscrollcommand=self.xscroll.set, yscrollcommand=self.yscroll.set)
+        self.canvas.bind('<Button-1>', lambda e: self.handle_event(e, self.on_click))
+        self.canvas.bind('<Button-3>', lambda e: self.handle_event(e, self.on_flag))
+        # Аккорд - средней кнопкой или двойным щелчком по числу
+        self.canvas.bind('<Button-2>', lambda e: self.handle_event(e, self.on_chord))
+        self.canvas.bind('<Double-Button-1>', lambda e: self.handle_event(e, self.on_chord))
+        self.items = {}  # клетка -> (прямоугольник, текст)
+        self.rows = 0
+        self.cols = 0
+        self.cell = 0
+        self.font = None
+
+    def build(self, rows, cols):
+        """Готовит холст под поле rows x cols: рисует фон и сетку закрытого поля"""
+        cell = max(MIN_CELL_SIZE, min(CELL_SIZE, MAX_BOARD_SIZE // max(rows, cols)))
+        if (rows, cols, cell) == (self.rows, self.cols, self.cell):
+            # Тот же размер поля: достаточно убрать клетки прошлой партии
+            self.reset()
+            return
+
+        canvas = self.canvas
+        canvas.delete('all')
+        self.items = {}
+        width, height = cols * cell, rows * cell
+        canvas.create_rectangle(0, 0, width, height, fill='lightgray', outline='gray')
+        for x in range(1, rows):
+            canvas.create_line(0, x * cell, width, x * cell, fill='gray')
+        for y in range(1, cols):
+            canvas.create_line(y * cell, 0, y * cell, height, fill='gray')
+        # Видимая часть не больше MAX_BOARD_SIZE, остальное поле доступно прокруткой
+        canvas.config(width=min(width, MAX_BOARD_SIZE), height=min(height, MAX_BOARD_SIZE),
+                      scrollregion=(0, 0, width, height))
+        canvas.xview_moveto(0)
+        canvas.yview_moveto(0)
+        if width > MAX_BOARD_SIZE:
+            self.xscroll.grid(row=1, column=0, sticky='ew')
+        else:
+            self.xscroll.grid_remove()
+        if height > MAX_BOARD_SIZE:
+            self.yscroll.grid(row=0, column=1, sticky='ns')
+        else:
+            self.yscroll.grid_remove()
+        self.font = ('Arial', max(6, cell * 3 // 8), 'bold')
+        self.rows, self.cols, self.cell = rows, cols, cell
+
+    def reset(self):
+        """Возвращает все клетки в начальный вид (закрытые, без флажка)"""
+        canvas = self.canvas
+        for rect, text in self.items.values():
+            canvas.delete(rect, text)
+        self.items = {}
+
+    def cell_items(self, i):
+        """Элементы клетки i (прямоугольник, текст); создаются при первом обращении"""
+        items = self.items.get(i)
+        if items is None:
+            cell = self.cell
+            x, y = divmod(i, self.cols)
+            left, top = y * cell, x * cell
+            items = (self.canvas.create_rectangle(left, top, left + cell, top + cell, outline='gray'),
+                     self.canvas.create_text(left + cell / 2, top + cell / 2, font=self.font))
+            self.items[i] = items
+        return items
+
+    def handle_event(self, event, callback):
+        """Переводит координаты клика на холсте в клетку поля"""
+        x = int(self.canvas.canvasy(event.y)) // self.cell
+        y = int(self.canvas.canvasx(event.x)) // self.cell
+        if 0 <= x < self.rows and 0 <= y < self.cols:
+            callback(x, y)
+
+    def draw_cell(self, board, i):
+        text, bg, opened = cell_look(board, i)
+        if not opened and not text:
+            # Клетка снова в начальном виде (сняли флажок) - ее видно на фоне поля
+            items = self.items.pop(i, None)
+            if items:
+                self.canvas.delete(*items)
+            return
+        rect, label = self.cell_items(i)
+        self.canvas.itemconfig(rect, fill=bg)
+        self.canvas.itemconfig(label, text=text)
+
+    def draw_mine(self, i):
+        rect, label = self.cell_items(i)
+        self.canvas.itemconfig(rect, fill='red')
+        self.canvas.itemconfig(label, text="💣")
+
+    def draw_cells(self, board, changed):
+        for i in changed:
+            self.draw_cell(board, i)
+
+    def destroy(self):
+        self.frame.destroy()
+        self.items = {}
+
+
+# Доступные способы отрисовки поля
+VIEWS = {'canvas': CanvasView, 'buttons': ButtonView}
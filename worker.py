@@ -0,0 +1,151 @@
+import queue
+import threading
+from profiling import profiler
+
+
+class AIWorker:
+    """
+    Фоновый поток для ИИ: поиск хода и запись опыта выполняются вне главного потока Tk,
+    чтобы окно не замирало, пока ИИ думает или сохраняет журнал.
+    Все обращения к AIHelper идут только из этого потока по очереди задач.
+    Ход ищется на копии поля; каждый запрос помечен версией поля, и если поле
+    успело измениться (номер версии ушел вперед), запрос отменяется.
+    Готовые результаты забирает главный поток через poll (по таймеру after()).
+    Если ИИ не передан, поток сам создает его и открывает опыт при запуске:
+    задачи, поставленные до этого, просто ждут в очереди, а окно не ждет ничего.
+    """
+    def __init__(self, ai=None):
+        self.ai = ai
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.stats = queue.Queue()  # Готовый текст статистики ИИ
+        self.version = 0  # Текущая версия поля, ее меняет главный поток
+        self.thread = threading.Thread(target=self.run, name="ai-worker", daemon=True)
+        self.thread.start()
+
+    def request_move(self, board, version, changed=None):
+        """
+        Ставит в очередь поиск хода для копии поля с версией version.
+        changed - клетки, изменившиеся с прошлого запроса (None - новая партия):
+        по ним ИИ обновляет границу, а не строит ее заново.
+        """
+        self.version = version
+        self.tasks.put(('move', board.copy(), version, changed))
+
+    def request_batch(self, board, version, changed=None):
+        """Ставит в очередь поиск всех однозначных ходов для копии поля (для автоигры)"""
+        self.version = version
+        self.tasks.put(('batch', board.copy(), version, changed))
+
+    def learn_moves(self, moves):
+        """Ставит в очередь запись нескольких ходов (x, y, успешен ли) одной задачей"""
+        self.tasks.put(('learn', moves))
+
+    def new_game(self, seed):
+        """
+        Ставит в очередь начало новой партии: генератор ИИ получает зерно поля,
+        как в simulate.py и replay.py, поэтому решения ИИ можно повторить по записи партии.
+        """
+        self.tasks.put(('new_game', seed))
+
+    def request_stats(self):
+        """Ставит в очередь получение статистики ИИ, ее забирает poll_stats"""
+        self.tasks.put(('stats',))
+
+    def cancel(self, version):
+        """Сообщает о новой версии поля: запросы для старых версий больше не нужны"""
+        self.version = version
+
+    def poll(self):
+        """Возвращает готовый результат (версия, действие, ход) или None"""
+        try:
+            return self.results.get_nowait()
+        except queue.Empty:
+            return None
+
+    def poll_stats(self):
+        """Возвращает готовый текст статистики ИИ или None"""
+        try:
+            return self.stats.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self, timeout=2.0):
+        """Останавливает поток, дождавшись записи опыта на диск"""
+        self.tasks.put(None)
+        self.thread.join(timeout)
+
+    def run(self):
+        if self.ai is None:
+            try:
+                self.ai = self.create_ai()
+            except Exception as e:
+                print(f"Ошибка при создании ИИ: {e}")
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                if self.ai is not None:
+                    self.ai.save_experience()
+                return
+            try:
+                if task[0] == 'move':
+                    self.find_move(*task[1:])
+                elif task[0] == 'batch':
+                    self.find_batch(*task[1:])
+                elif task[0] == 'stats':
+                    self.stats.put(self.ai.get_stats())
+                elif task[0] == 'new_game':
+                    self.ai.rng.seed(task[1])
+                else:
+                    for move in task[1]:
+                        self.ai.learn_from_move(*move)
+            except Exception as e:
+                print(f"Ошибка в потоке ИИ: {e}")
+                if task[0] == 'stats':
+                    self.stats.put(f"Ошибка: {e}")
+                elif task[0] in ('move', 'batch'):
+                    self.results.put((task[2], 'error', None))
+
+    def create_ai(self):
+        """Создает ИИ и сразу открывает его опыт - все это в потоке ИИ, а не в главном потоке"""
+        from ai import AIHelper
+        ai = AIHelper()
+        ai.experience.open()
+        return ai
+
+    def find_move(self, board, version, changed):
+        """Ищет ход так же, как раньше кнопка 🤖: сначала флажок на мину, иначе открытие клетки"""
+        ai = self.ai
+        # Границу обновляем и для отмененного запроса: изменения следующего считаются от этого поля
+        ai.set_field(board, board.rows, board.cols, changed)
+        if version != self.version:
+            return
+        mine_move = ai.get_mine_move()
+        if mine_move and not board.is_revealed(*mine_move) and not board.is_flagged(*mine_move):
+            self.results.put((version, 'flag', mine_move))
+            return
+        if version != self.version:
+            return
+        self.results.put((version, 'click', ai.get_safe_move()))
+
+    def find_batch(self, board, version, changed):
+        """
+        Ищет все ходы, которые следуют из одного прохода решателя: (безопасные клетки, мины).
+        Если однозначных ходов нет, возвращает одну клетку, выбранную по вероятности.
+        """
+        ai = self.ai
+        ai.set_field(board, board.rows, board.cols, changed)
+        if version != self.version:
+            return
+        safe, mines = ai.get_certain_moves()
+        mines = [move for move in mines if not board.is_flagged(*move)]
+        if safe or mines:
+            if mines:
+                profiler.count('decision.rules_mine', len(mines))
+            if safe:
+                profiler.count('decision.rules', len(safe))
+            self.results.put((version, 'batch', (safe, mines)))
+            return
+        if version != self.version:
+            return
+        self.results.put((version, 'batch', ([ai.get_safe_move()], [])))